@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+# Loaded here too, since this module is imported before trello_commands loads the credentials
+load_dotenv(dotenv_path="./credentials.env")
+
+# Local copies of Trello attachments shown by /order_comments, kept next to the other bot data
+ATTACHMENT_CACHE_DIR = "./database/attachment_cache"
+# Total size of cached files before the least recently used ones are evicted (bytes)
+ATTACHMENT_CACHE_MAX_BYTES = int(os.getenv('ATTACHMENT_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+
+# Disk cache of Trello attachments. Files are stored once per content hash (blobs/<sha256>), and an index maps
+# each Trello attachment id to its blob; blob modification times record use, for LRU eviction across restarts.
+class AttachmentCache:
+    def __init__(self, cache_dir=ATTACHMENT_CACHE_DIR, max_bytes=ATTACHMENT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.max_bytes = max_bytes
+        self._entries = None  # attachment id -> {'sha256', 'card_id', 'size'}; loaded on first use
+        self._blobs = OrderedDict()  # sha256 -> size, least recently used first
+        self._total_bytes = 0
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        os.makedirs(self.blob_dir, exist_ok=True)
+        try:
+            with open(self.index_path) as index_file:
+                entries = json.load(index_file)
+        except (OSError, ValueError):
+            entries = {}
+
+        # Blobs missing from disk drop their entries; blobs no entry points at are removed
+        blobs = []
+        for name in os.listdir(self.blob_dir):
+            path = os.path.join(self.blob_dir, name)
+            stat = os.stat(path)
+            blobs.append((stat.st_mtime, name, stat.st_size))
+        on_disk = {name for _, name, _ in blobs}
+        self._entries = {attachment_id: entry for attachment_id, entry in entries.items() if entry['sha256'] in on_disk}
+        referenced = {entry['sha256'] for entry in self._entries.values()}
+        for _, name, size in sorted(blobs):
+            if name in referenced:
+                self._blobs[name] = size
+                self._total_bytes += size
+            else:
+                self._remove_blob_file(name)
+
+    def _save_index(self):
+        # Written to a temporary file first so a crash never leaves a half-written index
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as index_file:
+            json.dump(self._entries, index_file)
+        os.replace(temp_path, self.index_path)
+
+    def _blob_path(self, sha256):
+        return os.path.join(self.blob_dir, sha256)
+
+    def _remove_blob_file(self, sha256):
+        try:
+            os.remove(self._blob_path(sha256))
+        except OSError:
+            pass  # Already gone, or still open for a send on platforms that lock open files
+
+    # Function to get the cached file for an attachment (marking it recently used), or None
+    def get(self, attachment_id):
+        self._load()
+        entry = self._entries.get(attachment_id)
+        if entry is None:
+            return None
+        path = self._blob_path(entry['sha256'])
+        try:
+            os.utime(path)
+        except OSError:
+            self._drop(attachment_id)
+            self._save_index()
+            return None
+        self._blobs.move_to_end(entry['sha256'])
+        return path
+
+    # Function to start a download into the cache; returns (temporary file, sha256 hasher) for the caller to fill
+    def begin_download(self):
+        self._load()
+        temp_file = tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix=".part", delete=False)
+        return temp_file, hashlib.sha256()
+
+    # Function to abandon a download started with begin_download
+    def abort_download(self, temp_file):
+        temp_file.close()
+        try:
+            os.remove(temp_file.name)
+        except OSError:
+            pass
+
+    # Function to file a finished download under its content hash and return the cached path
+    def finish_download(self, attachment_id, card_id, temp_file, hasher):
+        temp_file.close()
+        sha256 = hasher.hexdigest()
+        size = os.path.getsize(temp_file.name)
+        path = self._blob_path(sha256)
+        if sha256 in self._blobs:
+            os.remove(temp_file.name)  # Same content as a file already cached
+            os.utime(path)
+            self._blobs.move_to_end(sha256)
+        else:
+            os.replace(temp_file.name, path)
+            self._blobs[sha256] = size
+            self._total_bytes += size
+
+        previous = self._entries.get(attachment_id)
+        self._entries[attachment_id] = {'sha256': sha256, 'card_id': card_id, 'size': size}
+        if previous and previous['sha256'] != sha256:
+            self._release_blob(previous['sha256'])
+        self._evict(keep=sha256)
+        self._save_index()
+        return path
+
+    def _evict(self, keep):
+        # Least recently used blobs go first; the blob just written is kept even if it alone is over the limit
+        for sha256 in list(self._blobs):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if sha256 == keep:
+                continue
+            for attachment_id in [key for key, entry in self._entries.items() if entry['sha256'] == sha256]:
+                del self._entries[attachment_id]
+            self._delete_blob(sha256)
+
+    def _delete_blob(self, sha256):
+        self._total_bytes -= self._blobs.pop(sha256)
+        self._remove_blob_file(sha256)
+
+    def _release_blob(self, sha256):
+        # Blobs are shared by attachments with identical content; delete only when nothing points at it any more
+        if sha256 in self._blobs and not any(entry['sha256'] == sha256 for entry in self._entries.values()):
+            self._delete_blob(sha256)
+
+    def _drop(self, attachment_id):
+        entry = self._entries.pop(attachment_id, None)
+        if entry is not None:
+            self._release_blob(entry['sha256'])
+        return entry is not None
+
+    # Function to forget a deleted attachment
+    def invalidate(self, attachment_id):
+        self._load()
+        if self._drop(attachment_id):
+            self._save_index()
+
+    # Function to forget a card's cached attachments, except those still on the card
+    def invalidate_card(self, card_id, keep_ids=()):
+        self._load()
+        keep_ids = set(keep_ids)
+        stale = [attachment_id for attachment_id, entry in self._entries.items()
+                 if entry['card_id'] == card_id and attachment_id not in keep_ids]
+        for attachment_id in stale:
+            self._drop(attachment_id)
+        if stale:
+            self._save_index()
+
+    # Board action listener: drops cached files when their attachment or card is deleted on Trello
+    def handle_board_action(self, action):
+        data = action.get('data', {})
+        if action.get('type') == 'deleteAttachmentFromCard' and data.get('attachment'):
+            self.invalidate(data['attachment']['id'])
+        elif action.get('type') in ('deleteCard', 'moveCardFromBoard') and data.get('card'):
+            self.invalidate_card(data['card']['id'])
+
+# Shared cache used by /order_comments
+attachment_cache = AttachmentCache()
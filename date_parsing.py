@@ -0,0 +1,116 @@
+import re
+from datetime import date, datetime, time
+from functools import lru_cache
+from dateutil import parser
+
+# The formats the commands document: "27 Sep", "27 Sep 2024", "Sep 27 2024", "27" and "HH:MM"
+DAY_MONTH_PATTERN = re.compile(r'(\d{1,2})(?:st|nd|rd|th)?[\s/-]+([a-z]+)\.?(?:,?[\s/-]+(\d{4}))?', re.IGNORECASE)
+MONTH_DAY_PATTERN = re.compile(r'([a-z]+)\.?[\s/-]+(\d{1,2})(?:st|nd|rd|th)?(?:,?[\s/-]+(\d{4}))?', re.IGNORECASE)
+DAY_ONLY_PATTERN = re.compile(r'(\d{1,2})')
+TIME_PATTERN = re.compile(r'(\d{1,2}):(\d{2})')
+
+MONTHS = {name: number for number, names in enumerate((
+    ("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"), ("may",), ("jun", "june"),
+    ("jul", "july"), ("aug", "august"), ("sep", "sept", "september"), ("oct", "october"), ("nov", "november"),
+    ("dec", "december")), start=1) for name in names}
+
+# Function to split a date string into (day, month, year), with None for the parts left out; None if it isn't a known format
+@lru_cache(maxsize=512)
+def match_date(text):
+    text = text.strip()
+    match = DAY_MONTH_PATTERN.fullmatch(text)
+    if match:
+        day, month_name, year = match.groups()
+    else:
+        match = MONTH_DAY_PATTERN.fullmatch(text)
+        if match:
+            month_name, day, year = match.groups()
+        elif DAY_ONLY_PATTERN.fullmatch(text):
+            return int(text), None, None
+        else:
+            return None
+
+    month = MONTHS.get(month_name.lower())
+    if month is None:
+        return None
+    return int(day), month, int(year) if year else None
+
+# Function to split an "HH:MM" string into (hour, minute); None if it isn't that format
+@lru_cache(maxsize=512)
+def match_time(text):
+    match = TIME_PATTERN.fullmatch(text.strip())
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+# Function to parse a user-typed date; parts the user left out come from `default` (a date or datetime).
+# `dayfirst` only matters for all-numeric dates like "09/10/2024". Raises ValueError when the date can't be understood.
+def parse_date(date_str, default, dayfirst=True):
+    parts = match_date(date_str)
+    if parts is not None:
+        day, month, year = parts
+        return date(year or default.year, month or default.month, day)
+
+    # Anything else goes through dateutil, which fills missing parts from the default
+    default = datetime(default.year, default.month, default.day)
+    try:
+        return parser.parse(date_str, dayfirst=dayfirst, default=default).date()
+    except OverflowError as e:
+        raise ValueError(str(e))
+
+# Function to parse a user-typed time of day; `strict` accepts only "HH:MM". Raises ValueError when it can't be understood.
+def parse_time(time_str, strict=False):
+    parts = match_time(time_str)
+    if parts is not None:
+        return time(*parts)
+    if strict:
+        raise ValueError(f"'{time_str}' is not in HH:MM format.")
+    try:
+        return parser.parse(time_str).time()
+    except OverflowError as e:
+        raise ValueError(str(e))
+
+# Function to parse a separate date and time into a naive local datetime
+def parse_local_datetime(date_str, time_str, default):
+    return datetime.combine(parse_date(date_str, default), parse_time(time_str))
+
+# Function to parse a stored ISO timestamp (reminder times, due dates); results are cached because listings
+# and the scheduler parse the same stored values over and over
+@lru_cache(maxsize=4096)
+def parse_stored_time(value):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return parser.isoparse(value)
+
+# Micro-benchmark: python date_parsing.py
+if __name__ == "__main__":
+    import timeit
+
+    today = date(2024, 9, 1)
+    inputs = [("27 Sep", "14:30"), ("27 Sep 2024", "09:05"), ("Sep 27 2024", "23:59"), ("1 Jan", "00:00"), ("15", "12:00")]
+    stored = ["2024-09-27T09:30:00+00:00", "2024-12-01T05:00:00+00:00"]
+
+    def with_dateutil():
+        for date_str, time_str in inputs:
+            parser.parse(f"{date_str} {time_str}", dayfirst=True)
+        for value in stored:
+            parser.parse(value)
+
+    def with_fast_path():
+        for date_str, time_str in inputs:
+            parse_local_datetime(date_str, time_str, today)
+        for value in stored:
+            parse_stored_time(value)
+
+    def with_fast_path_uncached():
+        match_date.cache_clear()
+        match_time.cache_clear()
+        parse_stored_time.cache_clear()
+        with_fast_path()
+
+    runs = 2000
+    baseline = timeit.timeit(with_dateutil, number=runs)
+    for name, fn in (("dateutil", with_dateutil), ("fast path, cold cache", with_fast_path_uncached), ("fast path, warm cache", with_fast_path)):
+        elapsed = timeit.timeit(fn, number=runs)
+        print(f"{name:24} {elapsed / runs / (len(inputs) + len(stored)) * 1e6:8.2f} us/parse  {baseline / elapsed:6.1f}x")
@@ -1,15 +1,26 @@
+import asyncio
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
-from datetime import datetime
-from dateutil import parser
+from datetime import datetime, timedelta
+from date_parsing import parse_date, parse_time, parse_stored_time
 import os
 from reminder_commands import *
 from trello_commands import *
+from trello_webhook import start_webhook_server
+from trello_snapshot import load_board_snapshot, save_board_snapshot
+from trello_board import order_search
+from reminder_scheduler import ReminderScheduler
+from reminder_delivery import ChannelResolver, ReminderOutbox, split_message, user_mention
+from reminder_list import ReminderListView
+from order_move import OrderMoveView
+from reminder_retention import REMINDER_RETENTION_DAYS, prune_past_reminders, get_storage_usage
 from dotenv import load_dotenv
 
 load_dotenv(dotenv_path="./credentials.env")
 DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
+# Seconds between Trello board delta syncs (0 disables; use when webhooks cannot reach the bot)
+TRELLO_SYNC_INTERVAL = int(os.getenv('TRELLO_SYNC_INTERVAL', '0'))
 
 # Initialize bot with command prefix for old commands and intents
 intents = discord.Intents.default()
@@ -17,45 +28,115 @@ intents.message_content = True
 bot = commands.Bot(command_prefix="!", intents=intents)
 tree = bot.tree  # For slash commands
 
+# Resolves reminder channels from the gateway cache before falling back to REST
+channel_resolver = ChannelResolver(bot)
+
+# Sends queued reminder messages concurrently across channels, with retries
+reminder_outbox = ReminderOutbox(channel_resolver)
+
 # /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxx/
 
-# Function to check and send missed reminders on bot startup
+# Function to render the message for a reminder that fires on time
+def render_reminder(reminder):
+    reminder_id, reminder_time, message, user_name, user_id, channel_name, channel_id = reminder
+    return f"{user_mention(user_id)} **Reminder:** {message}"
+
+# Function to render the message for a reminder that came due while the bot was offline
+def render_missed_reminder(reminder):
+    reminder_id, reminder_time, message, user_name, user_id, channel_name, channel_id = reminder
+
+    # Convert reminder_time from ISO format to a datetime object in UTC
+    reminder_time_utc = parse_stored_time(reminder_time)
+
+    # Convert reminder_time from UTC to PST
+    reminder_time_pst = reminder_time_utc.astimezone(PST)
+
+    # Format reminder_time in a human-friendly way
+    formatted_reminder_time = reminder_time_pst.strftime('%d %b %Y %H:%M %Z')
+
+    return f"{user_mention(user_id)} **Missed Reminder:** {message} (was due at {formatted_reminder_time})"
+
+# Function to render one summary message for a channel with a large backlog of missed reminders
+def render_missed_digest(count, sample, user_ids):
+    lines = [f"**Missed Reminders:** {count} reminders came due while the bot was offline.",
+             " ".join(user_mention(user_id) for user_id in user_ids)]
+    for reminder in sample:
+        reminder_time_pst = parse_stored_time(reminder[1]).astimezone(PST)
+        lines.append(f"- {reminder[2]} (was due at {reminder_time_pst.strftime('%d %b %Y %H:%M %Z')})")
+    if count > len(sample):
+        lines.append(f"...and {count - len(sample)} more.")
+    return "\n".join(lines)
+
+# Missed reminders are queued in pages of this size
+MISSED_REMINDER_PAGE_SIZE = 100
+# Outbox backlog at which catch-up waits for sends to finish before queueing the next page
+MISSED_REMINDER_MAX_QUEUED = 200
+# Above this many missed reminders, each channel gets one summary instead of every reminder
+MISSED_REMINDER_DIGEST_THRESHOLD = int(os.getenv('MISSED_REMINDER_DIGEST_THRESHOLD', '50'))
+# Reminders listed in each channel summary
+MISSED_REMINDER_DIGEST_SAMPLE = 10
+
+# Function to check and send missed reminders on bot startup, streaming the backlog through the outbox
 async def send_missed_reminders():
     now_utc = datetime.now(UTC)
 
-    # Fetch reminders that were supposed to be sent before the current time
-    missed_reminders = get_due_reminders(now_utc.isoformat())
-
-    for reminder in missed_reminders:
-        reminder_id, reminder_time, message, user_name, user_id, channel_name, channel_id = reminder
+    backlog = await count_due_reminders(now_utc)
+    if backlog > MISSED_REMINDER_DIGEST_THRESHOLD:
+        print(f"{backlog} missed reminders, sending a summary per channel.")
+        for channel_id in await get_due_reminder_channels(now_utc):
+            await reminder_outbox.wait_for_capacity(MISSED_REMINDER_MAX_QUEUED)
+            reminder_outbox.submit(await enqueue_channel_digest(channel_id, now_utc, render_missed_digest, MISSED_REMINDER_DIGEST_SAMPLE))
+        return
+
+    # Queue reminders that were supposed to be sent before the current time, one page at a time
+    while True:
+        await reminder_outbox.wait_for_capacity(MISSED_REMINDER_MAX_QUEUED)
+        messages = await enqueue_due_reminders(now_utc, render_missed_reminder, limit=MISSED_REMINDER_PAGE_SIZE)
+        reminder_outbox.submit(messages)
+        if len(messages) < MISSED_REMINDER_PAGE_SIZE:
+            break
+
+# Startup catch-up task (kept referenced so it isn't garbage collected)
+missed_reminders_task = None
+
+# Function to catch up on missed reminders, then hand over to the scheduler; loading the schedule is retried
+# until it succeeds, since no reminder fires before the scheduler starts
+async def catch_up_reminders():
+    try:
+        await send_missed_reminders()
+    except Exception as e:
+        print(f"Error sending missed reminders: {e}")
 
+    while True:
         try:
-            # Convert reminder_time from ISO format to a datetime object in UTC
-            reminder_time_utc = datetime.fromisoformat(reminder_time)
-
-            # Convert reminder_time from UTC to PST
-            reminder_time_pst = reminder_time_utc.astimezone(PST)
-
-            # Format reminder_time in a human-friendly way
-            formatted_reminder_time = reminder_time_pst.strftime('%d %b %Y %H:%M %Z')
-
-            # Send the missed reminder
-            channel = await bot.fetch_channel(channel_id)
-            user = await bot.fetch_user(user_id)
-            await channel.send(f"{user.mention} **Missed Reminder:** {message} (was due at {formatted_reminder_time})")
-
-            # Move the reminder to the past_reminders table
-            move_reminder_to_past(reminder_id, reminder_time, message, user_name, user_id, channel_name, channel_id)
-
+            reminder_scheduler.start(await get_active_reminders())
+            return
         except Exception as e:
-            print(f"Error sending missed reminder: {e}")
+            print(f"Error starting the reminder scheduler, retrying in {REMINDER_RETRY_DELAY}s: {e}")
+            await asyncio.sleep(REMINDER_RETRY_DELAY)
 
 # /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxx/
 
 # Event: When the bot is ready
 @bot.event
 async def on_ready():
-    initialize_database()  # Ensure the database and tables are created
+    global board_reconcile_task, missed_reminders_task
+    await initialize_database()  # Ensure the database and tables are created
+
+    # Reminders saved before guild ids were stored get theirs from the channel cache
+    channel_guilds = {}
+    for channel_id in await get_channels_missing_guild():
+        channel = bot.get_channel(channel_id)
+        if channel is not None and getattr(channel, 'guild', None) is not None:
+            channel_guilds[channel_id] = channel.guild.id
+    if channel_guilds:
+        await backfill_reminder_guilds(channel_guilds)
+
+    # Serve order lookups from the saved board snapshot right away and reconcile it with Trello in the background
+    if not board_state.loaded:
+        load_board_snapshot(board_state)
+        board_reconcile_task = asyncio.create_task(reconcile_trello_board())
+
     print(f'Bot is online! Logged in as {bot.user}')
 
     for guild in bot.guilds:
@@ -68,30 +149,47 @@ async def on_ready():
     except Exception as e:
         print(f"Error syncing slash commands: {e}")
     
-    # Check for and send missed reminders
-    await send_missed_reminders()
-
-    # Start the reminder checking loop
-    check_reminders.start()
+    # Resume messages left in the outbox and catch up on missed reminders in the background;
+    # the reminder scheduler starts once the catch-up is done
+    if missed_reminders_task is None:
+        schedule_listeners.append(reminder_scheduler.schedule)
+        await reminder_outbox.start()
+        missed_reminders_task = asyncio.create_task(catch_up_reminders())
+
+    # Start the Trello board delta sync if it is enabled
+    if TRELLO_SYNC_INTERVAL and not sync_trello_board.is_running():
+        sync_trello_board.change_interval(seconds=TRELLO_SYNC_INTERVAL)
+        sync_trello_board.start()
+
+    # Start saving the board snapshot
+    if not save_trello_snapshot.is_running():
+        save_trello_snapshot.start()
+
+    # Start the past reminder retention task
+    if REMINDER_RETENTION_DAYS and not prune_reminder_history.is_running():
+        prune_reminder_history.start()
 
 # /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/
 
 # Slash Command: Set reminder using /remind with separate date, time, and message
 @tree.command(name="reminder", description="Set a reminder")
-@app_commands.describe(date="Date in format DD MMM (Year optional)", time="Time in format HH:MM", message="Reminder message")
-async def slash_remindme(interaction: discord.Interaction, date: str, time: str, message: str):
+@app_commands.describe(date="Date in format DD MMM (Year optional)", time="Time in format HH:MM", message="Reminder message",
+                       repeat="Repeat daily, weekdays, weekly, monthly, or on a cron rule like '0 9 * * 1'")
+async def slash_remindme(interaction: discord.Interaction, date: str, time: str, message: str, repeat: str = None):
     try:
         # Get user and channel details from the interaction
         user_name = interaction.user.name
         user_id = interaction.user.id
         channel_name = interaction.channel.name
         channel_id = interaction.channel.id
+        guild_id = interaction.guild_id
 
         # Call save_reminder to save the reminder and get the result
-        success, response = save_reminder(date, time, message, user_name, user_id, channel_name, channel_id)
+        success, response = await save_reminder(date, time, message, user_name, user_id, channel_name, channel_id, guild_id, repeat)
 
         if success:
-            await interaction.response.send_message(f"Reminder set for {response.strftime('%d %b %Y %H:%M %Z')}!")
+            repeats = " (repeating)" if repeat else ""
+            await interaction.response.send_message(f"Reminder set for {response.strftime('%d %b %Y %H:%M %Z')}{repeats}!")
         else:
             await interaction.response.send_message(response, ephemeral=True)  # Send the error message to the user
 
@@ -99,127 +197,131 @@ async def slash_remindme(interaction: discord.Interaction, date: str, time: str,
         print(f"Error parsing date or time: {e}")
         await interaction.response.send_message("Invalid date or time format. Please try again.", ephemeral=True)
 
-# Task: Checks every 10 seconds for due reminders
-@tasks.loop(seconds=10)
-async def check_reminders():
-    now_utc = datetime.now(UTC)
-
-    # Get reminders that are currently due
-    due_reminders = get_due_reminders(now_utc.isoformat())
-
-    for reminder in due_reminders:
-        reminder_id, reminder_time, message, user_name, user_id, channel_name, channel_id = reminder
+# Seconds to wait before retrying reminders that could not be queued
+REMINDER_RETRY_DELAY = 60
 
-        try:
-            # Send the reminder
-            channel = await bot.fetch_channel(channel_id)
-            user = await bot.fetch_user(user_id)
-            await channel.send(f"{user.mention} **Reminder:** {message}")
-
-            # Move the reminder to the past_reminders table
-            move_reminder_to_past(reminder_id, reminder_time, message, user_name, user_id, channel_name, channel_id)
+# Function to queue every reminder that is due; called by the scheduler when the next reminder comes due
+async def deliver_due_reminders(due_ids):
+    now_utc = datetime.now(UTC)
+    try:
+        reminder_outbox.submit(await enqueue_due_reminders(now_utc, render_reminder))
+    except Exception as e:
+        # The scheduler has already dropped these ids, so put them back for another attempt
+        print(f"Error queueing due reminders, retrying in {REMINDER_RETRY_DELAY}s: {e}")
+        for reminder_id in due_ids:
+            reminder_scheduler.schedule(reminder_id, now_utc + timedelta(seconds=REMINDER_RETRY_DELAY))
+
+# Scheduler that wakes up exactly when the next reminder is due
+reminder_scheduler = ReminderScheduler(deliver_due_reminders)
+
+# Task: Pulls new board actions from Trello and patches the board index
+@tasks.loop(seconds=30)
+async def sync_trello_board():
+    error = await sync_board_actions()
+    if error:
+        print(f"Error syncing Trello board: {error}")
+    else:
+        # Missing a few syncs in a row drops the index back to periodic reloads
+        board_state.mark_live(3 * TRELLO_SYNC_INTERVAL)
+
+# Background reconcile of the startup snapshot (kept referenced so it isn't garbage collected)
+board_reconcile_task = None
+
+# Seconds between retries of a failed snapshot reconcile, doubling up to the maximum
+BOARD_RECONCILE_RETRY = 30
+BOARD_RECONCILE_MAX_RETRY = 10 * 60
+
+# Function to bring the snapshot loaded at startup up to date (delta sync from its cursor, or a full load);
+# retried until it succeeds, since until then the snapshot is only as fresh as its save time
+async def reconcile_trello_board():
+    delay = BOARD_RECONCILE_RETRY
+    while True:
+        error = await sync_board_actions()
+        if not error:
+            board_state.mark_current()
+            return
+        print(f"Error reconciling Trello board snapshot, retrying in {delay}s: {error}")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, BOARD_RECONCILE_MAX_RETRY)
+
+# Task: Saves the board index to disk whenever it has changed
+saved_board_version = None
+
+@tasks.loop(seconds=60)
+async def save_trello_snapshot():
+    global saved_board_version
+    if board_state.version == saved_board_version:
+        return
+    try:
+        version = board_state.version
+        await save_board_snapshot(board_state)
+        saved_board_version = version
+    except Exception as e:
+        print(f"Error saving Trello board snapshot: {e}")
 
-        except Exception as e:
-            print(f"Error sending reminder: {e}")
+# Task: Archives past reminders older than the retention period and reclaims their space
+@tasks.loop(hours=6)
+async def prune_reminder_history():
+    try:
+        await prune_past_reminders()
+    except Exception as e:
+        print(f"Error pruning past reminders: {e}")
 
 # /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/
 
+# Function to turn an optional /reminders_list date bound into a PST datetime (end bounds cover the whole day)
+def parse_list_date(value, end_of_day=False):
+    if not value:
+        return None
+    day = datetime.combine(parse_date(value, default=datetime.now(PST)), datetime.min.time())
+    if end_of_day:
+        day += timedelta(days=1)
+    return PST.localize(day)
+
 # Slash Command: List reminders based on user selection
 @tree.command(name="reminders_list", description="List reminders (active, past, or both)")
+@app_commands.describe(scope="Whose reminders to list (defaults to your own)",
+                       from_date="Only reminders due on or after this date", to_date="Only reminders due up to this date")
 @app_commands.choices(reminder_type=[
     app_commands.Choice(name="Active", value="active"),
     app_commands.Choice(name="Past", value="past"),
     app_commands.Choice(name="Both", value="both")
+], scope=[
+    app_commands.Choice(name="Mine", value="mine"),
+    app_commands.Choice(name="This channel", value="channel"),
+    app_commands.Choice(name="This server", value="guild")
 ])
-async def slash_reminders_list(interaction: discord.Interaction, reminder_type: app_commands.Choice[str]):
+async def slash_reminders_list(interaction: discord.Interaction, reminder_type: app_commands.Choice[str],
+                               scope: app_commands.Choice[str] = None, from_date: str = None, to_date: str = None):
     try:
-        # Load active reminders and past reminders from files
-        active_reminders = get_active_reminders()  # Load active reminders
-        past_reminders = get_past_reminders()  # Load past reminders
-
-        # Function to safely convert time strings to datetime objects
-        def convert_to_datetime(time_value):
-            if isinstance(time_value, str):
-                return parser.parse(time_value)  # Convert string to datetime
-            elif isinstance(time_value, datetime):
-                return time_value  # Already a datetime object
-            else:
-                raise ValueError("Unsupported time format.")
-
-        # Paginate reminders based on user's choice
-        active_pages = []
-        past_pages = []
-        current_page = ""
-
-        if reminder_type.value == "active" or reminder_type.value == "both":
-            # Paginate active reminders
-            for reminder in active_reminders:
-                reminder_time_utc = convert_to_datetime(reminder['reminder_time'])
-                reminder_time_pst = reminder_time_utc.astimezone(pst)
-                reminder_str = f"**ID:** {reminder['id']}\n**Reminder Message:** {reminder['message']}\n**Time:** {reminder_time_pst.strftime('%d %b %Y %H:%M %Z')}\n**User:** {reminder['user_name']}\n**Channel:** {reminder['channel_name']}\n\n"
-                if len(current_page) + len(reminder_str) > 1900:
-                    active_pages.append(current_page)
-                    current_page = reminder_str
-                else:
-                    current_page += reminder_str
-
-            if current_page:
-                active_pages.append(current_page)
-
-        current_page = ""
-
-        if reminder_type.value == "past" or reminder_type.value == "both":
-            # Paginate past reminders
-            for past_reminder in past_reminders:
-                past_reminder_time_utc = convert_to_datetime(past_reminder['reminder_time'])
-                past_reminder_time_pst = past_reminder_time_utc.astimezone(pst)
-                past_reminder_str = f"**ID:** {past_reminder['id']}\n**Reminder Message:** {past_reminder['message']}\n**Time:** {past_reminder_time_pst.strftime('%d %b %Y %H:%M %Z')}\n**User:** {past_reminder['user_name']}\n**Channel:** {past_reminder['channel_name']}\n\n"
-                if len(current_page) + len(past_reminder_str) > 1900:
-                    past_pages.append(current_page)
-                    current_page = past_reminder_str
-                else:
-                    current_page += past_reminder_str
-
-            if current_page:
-                past_pages.append(current_page)
-
-        # Handle responses based on the reminder_type
-        if reminder_type.value == "active":
-            if active_pages:
-                await interaction.response.send_message(f"**Active Reminders (Page 1/{len(active_pages)})**\n```\n{active_pages[0]}\n```", ephemeral=True)
-                for i, page in enumerate(active_pages[1:]):
-                    await interaction.followup.send(f"**Active Reminders (Page {i + 2}/{len(active_pages)})**\n```\n{page}\n```", ephemeral=True)
-            else:
-                await interaction.response.send_message("No active reminders.", ephemeral=True)
-
-        elif reminder_type.value == "past":
-            if past_pages:
-                await interaction.response.send_message(f"**Past Reminders (Page 1/{len(past_pages)})**\n```\n{past_pages[0]}\n```", ephemeral=True)
-                for i, page in enumerate(past_pages[1:]):
-                    await interaction.followup.send(f"**Past Reminders (Page {i + 2}/{len(past_pages)})**\n```\n{page}\n```", ephemeral=True)
-            else:
-                await interaction.response.send_message("No past reminders.", ephemeral=True)
-
-        elif reminder_type.value == "both":
-            # Combine both active and past reminders
-            initial_message_sent = False
-
-            if active_pages:
-                await interaction.response.send_message(f"**Active Reminders (Page 1/{len(active_pages)})**\n```\n{active_pages[0]}\n```", ephemeral=True)
-                for i, page in enumerate(active_pages[1:]):
-                    await interaction.followup.send(f"**Active Reminders (Page {i + 2}/{len(active_pages)})**\n```\n{page}\n```", ephemeral=True)
-                initial_message_sent = True
-
-            if past_pages:
-                if not initial_message_sent:
-                    await interaction.response.send_message(f"**Past Reminders (Page 1/{len(past_pages)})**\n```\n{past_pages[0]}\n```", ephemeral=True)
-                else:
-                    await interaction.followup.send(f"**Past Reminders (Page 1/{len(past_pages)})**\n```\n{past_pages[0]}\n```", ephemeral=True)
-                for i, page in enumerate(past_pages[1:]):
-                    await interaction.followup.send(f"**Past Reminders (Page {i + 2}/{len(past_pages)})**\n```\n{page}\n```", ephemeral=True)
-
-            if not active_pages and not past_pages:
-                await interaction.response.send_message("No active or past reminders.", ephemeral=True)
+        # Every listing is scoped, so its cost follows the caller's reminders rather than the whole table
+        scope_value = scope.value if scope else "mine"
+        if scope_value == "guild":
+            if interaction.guild_id is None:
+                await interaction.response.send_message("Server reminders can only be listed inside a server.", ephemeral=True)
+                return
+            query_scope = ('guild_id', interaction.guild_id)
+        elif scope_value == "channel":
+            query_scope = ('channel_id', interaction.channel_id)
+        else:
+            query_scope = ('user_id', interaction.user.id)
+
+        try:
+            since = parse_list_date(from_date)
+            until = parse_list_date(to_date, end_of_day=True)
+        except (ValueError, OverflowError):
+            await interaction.response.send_message("Invalid date format. Please try again.", ephemeral=True)
+            return
+
+        # Only the first page is loaded now; the buttons fetch later pages on demand
+        view = ReminderListView(reminder_type.value, scope=query_scope, since=since, until=until)
+        if not await view.load_first_page():
+            empty = {"active": "No active reminders.", "past": "No past reminders.", "both": "No active or past reminders."}
+            await interaction.response.send_message(empty[reminder_type.value], ephemeral=True)
+            return
+
+        view.interaction = interaction
+        await interaction.response.send_message(view.render(), view=view, ephemeral=True)
 
     except Exception as e:
         print(f"Error loading or displaying reminders: {e}")
@@ -230,12 +332,42 @@ async def slash_reminders_list(interaction: discord.Interaction, reminder_type:
 
 # /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/
 
+# Function to format a byte count for display
+def format_bytes(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+# Slash Command: Report reminder storage usage (administrators only)
+@tree.command(name="reminders_storage", description="Show reminder database and archive storage usage")
+@app_commands.default_permissions(administrator=True)
+async def slash_reminders_storage(interaction: discord.Interaction):
+    try:
+        stats = await get_storage_usage()
+        retention = f"{REMINDER_RETENTION_DAYS} days" if REMINDER_RETENTION_DAYS > 0 else "disabled"
+        await interaction.response.send_message(
+            f"**Reminder Storage**\n"
+            f"**Database:** {format_bytes(stats['db_bytes'])} "
+            f"({format_bytes(stats['freelist_count'] * stats['page_size'])} free to reclaim)\n"
+            f"**Active Reminders:** {stats['active_reminders']}\n"
+            f"**Past Reminders:** {stats['past_reminders']}\n"
+            f"**Outbox Messages:** {stats['reminder_outbox']}\n"
+            f"**Archives:** {stats['archive_files']} files, {format_bytes(stats['archive_bytes'])}\n"
+            f"**Retention:** {retention}", ephemeral=True)
+    except Exception as e:
+        print(f"Error reading reminder storage usage: {e}")
+        await interaction.response.send_message("An error occurred while reading storage usage.", ephemeral=True)
+
+# /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/
+
 # Slash Command to remove a reminder
 @tree.command(name="reminder_remove", description="Remove an existing reminder")
 @app_commands.describe(idx="The reminder index to remove")
 async def removereminder(interaction: discord.Interaction, idx: int):
     # Call the function in reminder_commands.py to remove the reminder
-    _, message = remove_reminder(idx)
+    _, message = await remove_reminder(idx)
     
     # Respond with the message returned from remove_reminder
     await interaction.response.send_message(message, ephemeral=True)
@@ -247,23 +379,33 @@ async def removereminder(interaction: discord.Interaction, idx: int):
 @app_commands.describe(idx="The reminder index to edit", new_date="New date (optional, in format DD MMM YYYY)", new_time="New time (optional, in format HH:MM)", new_message="New message for the reminder (optional)")
 async def editreminder(interaction: discord.Interaction, idx: int, new_date: str = None, new_time: str = None, new_message: str = None):
     # Call the function in reminder_commands.py to edit the reminder
-    _, message = edit_reminder(idx, new_date, new_time, new_message)
+    _, message = await edit_reminder(idx, new_date, new_time, new_message)
     
     # Respond with the message returned from edit_reminder
     await interaction.response.send_message(message, ephemeral=True)
 
 # /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/
 
+# Function to suggest order numbers as the user types, straight from the in-memory board index (no Trello calls)
+async def order_num_autocomplete(interaction: discord.Interaction, current: str):
+    choices = []
+    for order_num in order_search.suggest(current):
+        card = board_state.find_order(order_num)
+        list_name = board_state.list_name(card['idList']) or "Unknown list"
+        choices.append(app_commands.Choice(name=f"{card['name']} ({list_name})"[:100], value=order_num))
+    return choices
+
 # Slash command to find the order in Trello
 @tree.command(name="order_status", description="Find an order in Trello")
 @app_commands.describe(order_num="The order number you want to search")
+@app_commands.autocomplete(order_num=order_num_autocomplete)
 async def find_order(interaction: discord.Interaction, order_num: int):
     try:
         # Defer the interaction with timeout (to prevent "This interaction failed")
         await interaction.response.defer()
 
         # Search for the order in Trello
-        result = search_order_in_trello(order_num, return_details=True)
+        result = await search_order_in_trello(order_num, return_details=True)
 
         # Send a follow-up message with the result
         if result:
@@ -283,6 +425,7 @@ async def find_order(interaction: discord.Interaction, order_num: int):
 # Slash command to move the order to another list in Trello (asynchronous version)
 @tree.command(name="order_move", description="Move an order to another list in Trello")
 @app_commands.describe(order_num="The order number you want to move")
+@app_commands.autocomplete(order_num=order_num_autocomplete)
 async def move_order(interaction: discord.Interaction, order_num: int):
     await interaction.response.defer()  # Defer the response to allow time for processing
 
@@ -290,62 +433,19 @@ async def move_order(interaction: discord.Interaction, order_num: int):
         # Immediately send a placeholder message to avoid interaction expiration
         await interaction.followup.send("Fetching Trello data, please wait...", ephemeral=True)
 
-        # Fetch Trello lists asynchronously
-        cached_lists, error = fetch_trello_lists()
-        if error:
-            await interaction.followup.send(error, ephemeral=True)
-            return
-
-        # Get the current list name for the order using the cached lists
-        current_list_name, error = get_current_list_name(order_num, cached_lists)
+        # Resolve the card and the board's lists once; the state is kept for the whole interaction
+        move, error = await start_order_move(order_num)
         if error:
             await interaction.followup.send(error, ephemeral=True)
             return
 
-        # Get available lists, excluding the current one
-        available_lists, error = get_available_trello_lists(current_list_name, cached_lists)
-        if error:
-            await interaction.followup.send(error, ephemeral=True)
+        if not move.target_lists:
+            await interaction.followup.send("There are no other lists to move this order to.", ephemeral=True)
             return
 
-        # Create select menu options using the list name and id
-        options = [
-            discord.SelectOption(label=list_info['name'], value=list_info['id'])
-            for list_info in available_lists
-        ]
-
-        # Define select menu for choosing a list
-        class ListSelect(discord.ui.Select):
-            def __init__(self, options):
-                super().__init__(placeholder="Choose a target list...", min_values=1, max_values=1, options=options)
-
-            async def callback(self, select_interaction: discord.Interaction):
-                # Get the selected target list ID
-                target_list_id = self.values[0]
-                target_list_name = next((opt.label for opt in options if opt.value == target_list_id), None)
-
-                if not target_list_name:
-                    await select_interaction.response.send_message("Error: Could not determine the target list name.", ephemeral=True)
-                    return
-
-                # Disable the select menu after selection
-                self.disabled = True
-
-                # Indicate processing status to the user
-                await select_interaction.response.edit_message(content="Moving order... Please wait.", view=self.view)
-
-                # Move the card using the selected list ID and name
-                result = move_order_in_trello(order_num, target_list_id, target_list_name)
-
-                # Send the result to the user
-                await select_interaction.followup.send(result)
-
-        # In the move_order command, create a view instance before sending the select menu
-        view = discord.ui.View(timeout=180)
-        view.add_item(ListSelect(options))
-
         # Send the select menu to the user
-        await interaction.followup.send(f"Order # **{order_num}** from list **{current_list_name}** is selected:", view=view, ephemeral=True)
+        view = OrderMoveView(move)
+        view.message = await interaction.followup.send(view.render(), view=view, ephemeral=True, wait=True)
 
     except Exception as e:
         try:
@@ -358,13 +458,14 @@ async def move_order(interaction: discord.Interaction, order_num: int):
 # Slash command to get the latest comments for an order
 @tree.command(name="order_comments", description="Get the latest comments on an order")
 @app_commands.describe(order_num="The order number you want to get comments for")
+@app_commands.autocomplete(order_num=order_num_autocomplete)
 async def get_comments(interaction: discord.Interaction, order_num: int):
     try:
         # Defer the interaction to prevent timeouts
         await interaction.response.defer()
 
         # Fetch the latest comments and attachments from Trello
-        comments, attachments = fetch_latest_comments(order_num)
+        comments, attachments = await fetch_latest_comments(order_num)
 
         if attachments:  # If attachments exist
             # Send comments with files as attachments in Discord
@@ -381,6 +482,7 @@ async def get_comments(interaction: discord.Interaction, order_num: int):
 # Slash command to add a comment with an attachment to an order in Trello
 @tree.command(name="add_order_comment", description="Add a comment and/or attach a file to an order in Trello")
 @app_commands.describe(order_num="The order number you want to comment on", comment_text="The comment you want to add", attachment="The file you want to attach (optional)")
+@app_commands.autocomplete(order_num=order_num_autocomplete)
 async def add_comment_with_attachment(interaction: discord.Interaction, order_num: int, comment_text: str = None, attachment: discord.Attachment = None):
     try:
         # Defer the interaction to prevent timeouts
@@ -400,24 +502,22 @@ async def add_comment_with_attachment(interaction: discord.Interaction, order_nu
 # Slash command to set or edit due date for an order in Trello
 @tree.command(name="set_order_due_date", description="Set or edit the due date for an order in Trello")
 @app_commands.describe(order_num="The order number you want to set the due date for", date="The due date (e.g., '27 Sep', 'Sep 27 2024', etc.)", time="The time in HH:MM 24-hour format")
+@app_commands.autocomplete(order_num=order_num_autocomplete)
 async def set_order_due_date(interaction: discord.Interaction, order_num: int, date: str, time: str):
     try:
         # Acknowledge the interaction first
         await interaction.response.defer()
 
-        # Get current date for default year or month if needed
-        current_year = datetime.now().year
-        current_month = datetime.now().month
-
-        # Try to parse the date string flexibly
+        # Try to parse the date string flexibly; a missing year or month defaults to the current one (and a missing day to
+        # the 1st), and numeric dates are read month first
         try:
-            due_date = parser.parse(date, default=datetime(current_year, current_month, 1))
+            due_date = parse_date(date, default=datetime.now().replace(day=1), dayfirst=False)
         except ValueError:
             raise ValueError("Invalid date format. Please provide a recognizable date like '27 Sep' or 'Sep 27 2024'.")
 
         # Time is required, parse it
         try:
-            due_time = datetime.strptime(time, "%H:%M").time()  # Only parse time in HH:MM format
+            due_time = parse_time(time, strict=True)
         except ValueError:
             raise ValueError("Invalid time format. Please provide time in HH:MM 24-hour format.")
 
@@ -425,7 +525,7 @@ async def set_order_due_date(interaction: discord.Interaction, order_num: int, d
         due_datetime = datetime.combine(due_date, due_time)
 
         # Call the function from trello_commands to set the due date
-        if set_order_due_date_in_trello(order_num, due_datetime):
+        if await set_order_due_date_in_trello(order_num, due_datetime):
             await interaction.followup.send(f"Due date for order **# {order_num}** has been set to **{due_datetime.strftime('%d %b %Y %H:%M')}** PST.")
         else:
             await interaction.followup.send(f"Failed to set due date for order **# {order_num}**.")
@@ -435,5 +535,80 @@ async def set_order_due_date(interaction: discord.Interaction, order_num: int, d
 
 # /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxx/
 
+# Function to suggest board lists as the user types, from the board index
+async def list_name_autocomplete(interaction: discord.Interaction, current: str):
+    current = current.strip().lower()
+    return [app_commands.Choice(name=list_['name'][:100], value=list_['name'][:100])
+            for list_ in board_state.ordered_lists() if current in list_['name'].lower()][:25]
+
+# Function to send a bulk command summary, split across messages when it is longer than Discord allows
+async def send_bulk_summary(interaction, summary):
+    for piece in split_message(summary):
+        await interaction.followup.send(piece)
+
+# Slash command to move many orders to one list
+@tree.command(name="orders_bulk_move", description="Move several orders to another list in Trello")
+@app_commands.describe(to_list="The list to move the orders to", orders="Order numbers, e.g. '1201, 1205-1210'",
+                       from_list="Move every order in this list instead")
+@app_commands.autocomplete(to_list=list_name_autocomplete, from_list=list_name_autocomplete)
+async def bulk_move_orders(interaction: discord.Interaction, to_list: str, orders: str = None, from_list: str = None):
+    try:
+        await interaction.response.defer()
+
+        # Every card is resolved from the board index in one pass before any update is sent
+        cards, missing, error = await select_bulk_orders(orders, from_list)
+        if error:
+            await interaction.followup.send(error, ephemeral=True)
+            return
+
+        await send_bulk_summary(interaction, await bulk_move_orders_in_trello(cards, missing, to_list))
+
+    except Exception as e:
+        await interaction.followup.send(f"Error moving orders: {str(e)}", ephemeral=True)
+
+# Slash command to set the same due date on many orders
+@tree.command(name="orders_bulk_due_date", description="Set the due date for several orders in Trello")
+@app_commands.describe(date="The due date (e.g., '27 Sep', 'Sep 27 2024', etc.)", time="The time in HH:MM 24-hour format",
+                       orders="Order numbers, e.g. '1201, 1205-1210'", from_list="Update every order in this list instead")
+@app_commands.autocomplete(from_list=list_name_autocomplete)
+async def bulk_set_order_due_date(interaction: discord.Interaction, date: str, time: str, orders: str = None, from_list: str = None):
+    try:
+        await interaction.response.defer()
+
+        try:
+            # Same rules as /set_order_due_date
+            due_datetime = datetime.combine(parse_date(date, default=datetime.now().replace(day=1), dayfirst=False),
+                                            parse_time(time, strict=True))
+        except ValueError:
+            await interaction.followup.send("Invalid date or time format. Please try again.", ephemeral=True)
+            return
+
+        cards, missing, error = await select_bulk_orders(orders, from_list)
+        if error:
+            await interaction.followup.send(error, ephemeral=True)
+            return
+
+        await send_bulk_summary(interaction, await bulk_set_order_due_date_in_trello(cards, missing, due_datetime))
+
+    except Exception as e:
+        await interaction.followup.send(f"Error setting due dates: {str(e)}", ephemeral=True)
+
+# /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxx/
+
+# Function to run the bot (and the Trello webhook receiver, if enabled) and clean up on shutdown
+async def run_bot():
+    discord.utils.setup_logging()
+    webhook_runner = await start_webhook_server()
+    async with bot:
+        try:
+            await bot.start(DISCORD_TOKEN)
+        finally:
+            if webhook_runner:
+                await webhook_runner.cleanup()
+            await save_board_snapshot(board_state)
+            await trello_client.close()
+            await reminder_outbox.close()
+            await reminder_store.close()
+
 # Run the bot
-bot.run(DISCORD_TOKEN)
\ No newline at end of file
+asyncio.run(run_bot())
\ No newline at end of file
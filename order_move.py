@@ -0,0 +1,79 @@
+import discord
+from trello_commands import ORDER_MOVE_TIMEOUT, move_order_in_trello
+
+# Discord allows at most 25 options in a select menu; longer list catalogs are paged
+SELECT_OPTION_LIMIT = 25
+
+class TargetListSelect(discord.ui.Select):
+    def __init__(self, options):
+        super().__init__(placeholder="Choose a target list...", min_values=1, max_values=1, options=options)
+
+    async def callback(self, select_interaction: discord.Interaction):
+        await self.view.move_to(select_interaction, self.values[0])
+
+# Select menu for one /order_move; pages through the list catalog resolved with the card, without refetching
+class OrderMoveView(discord.ui.View):
+    def __init__(self, move):
+        super().__init__(timeout=ORDER_MOVE_TIMEOUT)
+        self.move = move
+        self.page = 0
+        self.page_count = max(1, -(-len(move.target_lists) // SELECT_OPTION_LIMIT))
+        self.message = None  # Message holding the menu, used to disable it on timeout
+        self._build_page()
+
+    def _build_page(self):
+        self.clear_items()
+        start = self.page * SELECT_OPTION_LIMIT
+        options = [discord.SelectOption(label=list_['name'][:100], value=list_['id'])
+                   for list_ in self.move.target_lists[start:start + SELECT_OPTION_LIMIT]]
+        self.add_item(TargetListSelect(options))
+
+        if self.page_count > 1:
+            prev_button = discord.ui.Button(label="Prev", style=discord.ButtonStyle.secondary, disabled=self.page == 0)
+            prev_button.callback = self._prev_page
+            next_button = discord.ui.Button(label="Next", style=discord.ButtonStyle.secondary, disabled=self.page >= self.page_count - 1)
+            next_button.callback = self._next_page
+            self.add_item(prev_button)
+            self.add_item(next_button)
+
+    def render(self):
+        content = f"Order # **{self.move.order_num}** from list **{self.move.current_list_name}** is selected:"
+        if self.page_count > 1:
+            content += f" (lists page {self.page + 1}/{self.page_count})"
+        return content
+
+    async def _prev_page(self, interaction: discord.Interaction):
+        self.move.touch()
+        self.page = max(0, self.page - 1)
+        self._build_page()
+        await interaction.response.edit_message(content=self.render(), view=self)
+
+    async def _next_page(self, interaction: discord.Interaction):
+        self.move.touch()
+        self.page = min(self.page_count - 1, self.page + 1)
+        self._build_page()
+        await interaction.response.edit_message(content=self.render(), view=self)
+
+    async def move_to(self, select_interaction: discord.Interaction, target_list_id):
+        # Disable the menu after selection
+        for item in self.children:
+            item.disabled = True
+        self.stop()
+
+        # Indicate processing status to the user
+        await select_interaction.response.edit_message(content="Moving order... Please wait.", view=self)
+
+        # The card and lists were resolved when the command ran, so this is a single request
+        result = await move_order_in_trello(self.move, target_list_id)
+
+        # Send the result to the user
+        await select_interaction.followup.send(result)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
@@ -1,7 +1,12 @@
 from datetime import datetime
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import os
 import sqlite3
+import time
 import pytz
-from dateutil import parser
+from date_parsing import parse_local_datetime, parse_stored_time
+from reminder_recurrence import build_recurrence, localize_wall_time, next_occurrence, rebuild_recurrence
 
 # Time zone for PST
 PST = pytz.timezone('Asia/Karachi')
@@ -9,13 +14,72 @@ UTC = pytz.UTC
 
 DB_PATH = "./database/reminders.db"
 
-# Function to initialize the database and create tables if they don't exist
-def initialize_database():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+# Callbacks told whenever a reminder's due time changes: listener(reminder_id, reminder_time_utc), None when removed
+schedule_listeners = []
+
+# Function to tell the schedule listeners that a reminder was added, moved or removed
+def notify_schedule_change(reminder_id, reminder_time_utc):
+    for listener in schedule_listeners:
+        listener(reminder_id, reminder_time_utc)
+
+# /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/
+
+# Reminder storage: one long-lived WAL-mode connection owned by a dedicated database thread
+class ReminderStore:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reminder-db")
+        self._conn = None
+
+    # Runs on the database thread; the connection is opened on first use and kept open
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, cached_statements=256)
+            conn.execute('PRAGMA auto_vacuum=INCREMENTAL')  # Only applies to a new file; see _enable_incremental_vacuum
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')  # Safe with WAL; skips an fsync per commit
+            self._conn = conn
+        return self._conn
+
+    def _call(self, fn, args):
+        return fn(self._connection(), *args)
+
+    # Function to run fn(conn, *args) on the database thread without blocking the event loop
+    async def run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, fn, args)
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._close)
+
+# Shared store used by every reminder function
+reminder_store = ReminderStore(DB_PATH)
+
+# /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/
 
+# Function to initialize the database and create tables if they don't exist
+async def initialize_database():
+    await reminder_store.run(_initialize_database)
+
+# Function to convert a reminder time (aware datetime or stored ISO string) to epoch seconds for the due_at column
+def to_epoch(reminder_time):
+    if isinstance(reminder_time, str):
+        reminder_time = parse_stored_time(reminder_time)
+    if reminder_time.tzinfo is None:
+        reminder_time = UTC.localize(reminder_time)
+    return int(reminder_time.timestamp())
+
+# Schema version 1: the original tables
+def _migration_1_create_tables(conn):
     # Create reminders table if it doesn't exist
-    cursor.execute('''
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS active_reminders (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             reminder_time TEXT,
@@ -28,7 +92,7 @@ def initialize_database():
     ''')
 
     # Create past_reminders table if it doesn't exist
-    cursor.execute('''
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS past_reminders (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             reminder_time TEXT,
@@ -40,65 +104,286 @@ def initialize_database():
         )
     ''')
 
-    conn.commit()
-    conn.close()
+# Schema version 2: integer due time (epoch seconds, UTC) with indexes for due scans and per-user/channel lookups
+def _migration_2_due_at(conn):
+    for table in ('active_reminders', 'past_reminders'):
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN due_at INTEGER')
 
-# /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/
+        # Backfill from the ISO strings written by older versions
+        rows = conn.execute(f'SELECT id, reminder_time FROM {table}').fetchall()
+        conn.executemany(f'UPDATE {table} SET due_at = ? WHERE id = ?',
+                         [(to_epoch(reminder_time), reminder_id) for reminder_id, reminder_time in rows])
+
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_due_at ON {table} (due_at)')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_user_id ON {table} (user_id)')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_channel_id ON {table} (channel_id)')
+
+# Schema version 3: claim marker so a due reminder is handed to exactly one delivery run
+def _migration_3_claimed_at(conn):
+    conn.execute('ALTER TABLE active_reminders ADD COLUMN claimed_at INTEGER')
+
+# Schema version 4: durable outbox of rendered reminder messages waiting to be sent
+def _migration_4_outbox(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS reminder_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            reminder_id INTEGER,
+            channel_id INTEGER,
+            content TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at INTEGER NOT NULL,
+            last_error TEXT,
+            created_at INTEGER
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_reminder_outbox_status ON reminder_outbox (status, next_attempt_at)')
+
+# Schema version 5: guild id on every reminder, and (scope, due_at) indexes so scoped listings only
+# touch the caller's own rows (the rowid is implied as the last index column, giving the (due_at, id) order)
+def _migration_5_guild_scope(conn):
+    for table in ('active_reminders', 'past_reminders'):
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN guild_id INTEGER')
+        conn.execute(f'DROP INDEX IF EXISTS idx_{table}_user_id')
+        conn.execute(f'DROP INDEX IF EXISTS idx_{table}_channel_id')
+        for column in REMINDER_SCOPES:
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_{column}_due_at ON {table} ({column}, due_at)')
+
+# Schema version 6: recurrence rule; a recurring reminder stays one row whose due time moves to the next occurrence
+def _migration_6_recurrence(conn):
+    for table in ('active_reminders', 'past_reminders'):
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN recurrence TEXT')
+
+# sqlite's auto_vacuum value for INCREMENTAL
+AUTO_VACUUM_INCREMENTAL = 2
+
+# Function to switch a database created before incremental auto-vacuum over to it; takes one full VACUUM,
+# which rewrites the whole file, so it runs once at startup before any reminder is delivered
+def _enable_incremental_vacuum(conn):
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+        return
+    print("Switching the reminder database to incremental vacuum; this rewrites the file once and may take a while...")
+    started = time.monotonic()
+    conn.execute(f'PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}')
+    conn.execute('VACUUM')
+    print(f"Reminder database switched to incremental vacuum in {time.monotonic() - started:.1f}s.")
+
+# Ordered list of schema migrations; the position in the list (starting at 1) is the schema version
+MIGRATIONS = [
+    _migration_1_create_tables,
+    _migration_2_due_at,
+    _migration_3_claimed_at,
+    _migration_4_outbox,
+    _migration_5_guild_scope,
+    _migration_6_recurrence,
+]
+
+def _initialize_database(conn):
+    conn.execute('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)')
+    current_version = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()[0] or 0
+
+    # Apply each pending migration in its own transaction so a failed upgrade leaves the previous version intact
+    for version, migration in enumerate(MIGRATIONS, start=1):
+        if version <= current_version:
+            continue
+        try:
+            conn.execute('BEGIN')
+            migration(conn)
+            conn.execute('INSERT INTO schema_version (version) VALUES (?)', (version,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"Reminder database migrated to schema version {version}.")
+
+    _enable_incremental_vacuum(conn)
+
+    # Claims left behind by a previous run that never reached the outbox were not delivered; make them due again
+    with conn:
+        conn.execute('''UPDATE active_reminders SET claimed_at = NULL
+                        WHERE claimed_at IS NOT NULL AND id NOT IN (SELECT reminder_id FROM reminder_outbox WHERE reminder_id IS NOT NULL)''')
 
-# Function to check for reminders due at a certain time or missed
-def get_due_reminders(before_time):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Fetch reminders that are due (i.e., `reminder_time` is less than or equal to `before_time`)
-    cursor.execute('''SELECT id, reminder_time, message, user_name, user_id, channel_name, channel_id 
-                      FROM active_reminders WHERE reminder_time <= ?''', (before_time,))
-    
-    due_reminders = cursor.fetchall()
-    
-    conn.close()
-    return due_reminders
-
-# Function to move a reminder to the past_reminders table
-def move_reminder_to_past(reminder_id, reminder_time, message, user_name, user_id, channel_name, channel_id):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+# /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/
 
+# Function to claim due reminders (the oldest `limit` of them, or all) and queue their rendered messages
+# in the outbox, in a single transaction; render(reminder_row) returns the message text
+async def enqueue_due_reminders(before_time, render, limit=None):
+    messages, rescheduled = await reminder_store.run(_enqueue_due_reminders, to_epoch(before_time), render, limit)
+    for reminder_id, next_time_utc in rescheduled:
+        notify_schedule_change(reminder_id, next_time_utc)
+    return messages
+
+def _enqueue_due_reminders(conn, before_epoch, render, limit):
+    now = int(datetime.now(UTC).timestamp())
+    messages = []
     try:
-        # Insert reminder into past_reminders table
-        cursor.execute('''
-            INSERT INTO past_reminders (reminder_time, message, user_name, user_id, channel_name, channel_id)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (reminder_time, message, user_name, user_id, channel_name, channel_id))
-        
-        # Remove reminder from reminders table after moving it to past_reminders
-        cursor.execute('DELETE FROM active_reminders WHERE id = ?', (reminder_id,))
-        
+        # Claiming and queueing together means overlapping runs never send the same reminder twice
+        conn.execute('BEGIN IMMEDIATE')
+        due_reminders = conn.execute('''SELECT id, reminder_time, message, user_name, user_id, channel_name, channel_id, recurrence
+                                        FROM active_reminders WHERE due_at <= ? AND claimed_at IS NULL
+                                        ORDER BY due_at, id LIMIT ?''', (before_epoch, -1 if limit is None else limit)).fetchall()
+        for reminder in due_reminders:
+            reminder_id, channel_id, content = reminder[0], reminder[6], render(reminder[:7])
+
+            # A recurring reminder's row stays active, so its message is not tied to it
+            outbox_reminder_id = None if reminder[7] else reminder_id
+            cursor = conn.execute('''INSERT INTO reminder_outbox (reminder_id, channel_id, content, next_attempt_at, created_at)
+                                     VALUES (?, ?, ?, ?, ?)''', (outbox_reminder_id, channel_id, content, now, now))
+            messages.append({'id': cursor.lastrowid, 'reminder_id': outbox_reminder_id, 'channel_id': channel_id,
+                             'content': content, 'attempts': 0, 'next_attempt_at': now})
+        conn.executemany('UPDATE active_reminders SET claimed_at = ? WHERE id = ?',
+                         [(now, reminder[0]) for reminder in due_reminders if not reminder[7]])
+        rescheduled = _advance_recurring_reminders(conn, [reminder[0] for reminder in due_reminders if reminder[7]], now)
         conn.commit()
-    except Exception as e:
-        print(f"Error moving reminder to past_reminders: {e}")
-    finally:
-        conn.close()
+    except Exception:
+        conn.rollback()
+        raise
+    return messages, rescheduled
+
+# Function to record the occurrence of each recurring reminder that just fired in past_reminders and move it
+# to its next occurrence after `now`; missed occurrences are skipped rather than replayed. A rule with no next
+# occurrence ends its reminder instead of failing the whole claim. Returns (id, next time or None if ended) pairs.
+def _advance_recurring_reminders(conn, reminder_ids, now):
+    now_utc = datetime.fromtimestamp(now, UTC)
+    rescheduled = []
+    for reminder_id in reminder_ids:
+        conn.execute('''
+            INSERT INTO past_reminders (reminder_time, due_at, message, user_name, user_id, channel_name, channel_id, guild_id, recurrence)
+            SELECT reminder_time, due_at, message, user_name, user_id, channel_name, channel_id, guild_id, recurrence
+            FROM active_reminders WHERE id = ?
+        ''', (reminder_id,))
+        rule = conn.execute('SELECT recurrence FROM active_reminders WHERE id = ?', (reminder_id,)).fetchone()[0]
+        try:
+            next_time_utc = next_occurrence(rule, now_utc, PST)
+        except Exception as e:
+            print(f"Ending recurring reminder {reminder_id}: {e}")
+            conn.execute('DELETE FROM active_reminders WHERE id = ?', (reminder_id,))
+            rescheduled.append((reminder_id, None))
+            continue
+        conn.execute('UPDATE active_reminders SET reminder_time = ?, due_at = ? WHERE id = ?',
+                     (next_time_utc.isoformat(), to_epoch(next_time_utc), reminder_id))
+        rescheduled.append((reminder_id, next_time_utc))
+    return rescheduled
+
+# Function to count due reminders that have not been queued yet
+async def count_due_reminders(before_time):
+    return await reminder_store.run(_count_due_reminders, to_epoch(before_time))
+
+def _count_due_reminders(conn, before_epoch):
+    return conn.execute('SELECT COUNT(*) FROM active_reminders WHERE due_at <= ? AND claimed_at IS NULL', (before_epoch,)).fetchone()[0]
+
+# Function to list the channels that have due reminders waiting
+async def get_due_reminder_channels(before_time):
+    return await reminder_store.run(_get_due_reminder_channels, to_epoch(before_time))
+
+def _get_due_reminder_channels(conn, before_epoch):
+    cursor = conn.execute('''SELECT DISTINCT channel_id FROM active_reminders
+                             WHERE due_at <= ? AND claimed_at IS NULL''', (before_epoch,))
+    return [row[0] for row in cursor.fetchall()]
+
+# Function to replace a channel's due reminders with one summary message in the outbox, in a single transaction;
+# render(count, sample_rows, user_ids) returns the summary text
+async def enqueue_channel_digest(channel_id, before_time, render, sample_size):
+    messages, rescheduled = await reminder_store.run(_enqueue_channel_digest, channel_id, to_epoch(before_time), render, sample_size)
+    for reminder_id, next_time_utc in rescheduled:
+        notify_schedule_change(reminder_id, next_time_utc)
+    return messages
+
+def _enqueue_channel_digest(conn, channel_id, before_epoch, render, sample_size):
+    now = int(datetime.now(UTC).timestamp())
+    where = 'channel_id = ? AND due_at <= ? AND claimed_at IS NULL'
+    params = (channel_id, before_epoch)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        count = conn.execute(f'SELECT COUNT(*) FROM active_reminders WHERE {where}', params).fetchone()[0]
+        if not count:
+            conn.commit()
+            return [], []
+
+        sample = conn.execute(f'''SELECT id, reminder_time, message, user_name, user_id, channel_name, channel_id
+                                  FROM active_reminders WHERE {where} ORDER BY due_at, id LIMIT ?''', params + (sample_size,)).fetchall()
+        user_ids = [row[0] for row in conn.execute(f'SELECT DISTINCT user_id FROM active_reminders WHERE {where}', params)]
+        content = render(count, sample, user_ids)
+        cursor = conn.execute('''INSERT INTO reminder_outbox (reminder_id, channel_id, content, next_attempt_at, created_at)
+                                 VALUES (NULL, ?, ?, ?, ?)''', (channel_id, content, now, now))
+
+        # The summary stands in for every reminder it covers, so they are archived (or moved on, if recurring) right away
+        recurring_ids = [row[0] for row in conn.execute(f'SELECT id FROM active_reminders WHERE {where} AND recurrence IS NOT NULL', params)]
+        rescheduled = _advance_recurring_reminders(conn, recurring_ids, now)
+        conn.execute(f'''
+            INSERT INTO past_reminders (reminder_time, due_at, message, user_name, user_id, channel_name, channel_id, guild_id)
+            SELECT reminder_time, due_at, message, user_name, user_id, channel_name, channel_id, guild_id
+            FROM active_reminders WHERE {where}
+        ''', params)
+        conn.execute(f'DELETE FROM active_reminders WHERE {where}', params)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return [{'id': cursor.lastrowid, 'reminder_id': None, 'channel_id': channel_id,
+             'content': content, 'attempts': 0, 'next_attempt_at': now}], rescheduled
+
+# Function to load outbox messages that still have to be sent (after a restart)
+async def get_pending_outbox_messages():
+    return await reminder_store.run(_get_pending_outbox_messages)
+
+def _get_pending_outbox_messages(conn):
+    cursor = conn.execute('''SELECT id, reminder_id, channel_id, content, attempts, next_attempt_at
+                             FROM reminder_outbox WHERE status = 'pending' ORDER BY id''')
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+# Function to record a failed send that will be retried
+async def record_outbox_retry(outbox_id, attempts, next_attempt_at, error):
+    await reminder_store.run(_record_outbox_retry, outbox_id, attempts, next_attempt_at, error)
+
+def _record_outbox_retry(conn, outbox_id, attempts, next_attempt_at, error):
+    with conn:
+        conn.execute('UPDATE reminder_outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?',
+                     (attempts, next_attempt_at, error, outbox_id))
+
+# Function to settle finished outbox messages in bulk: sent ones are removed, dead ones kept with their error,
+# and the reminders behind both are moved to past_reminders
+async def complete_outbox_messages(sent, dead):
+    if sent or dead:
+        await reminder_store.run(_complete_outbox_messages, sent, dead)
+
+def _complete_outbox_messages(conn, sent, dead):
+    with conn:
+        reminder_rows = [(message['reminder_id'],) for message in sent + dead if message['reminder_id'] is not None]
+        _archive_reminders(conn, reminder_rows)
+        conn.executemany('DELETE FROM reminder_outbox WHERE id = ?', [(message['id'],) for message in sent])
+        conn.executemany("UPDATE reminder_outbox SET status = 'dead', attempts = ?, last_error = ? WHERE id = ?",
+                         [(message['attempts'], message['last_error'], message['id']) for message in dead])
+
+def _archive_reminders(conn, id_rows):
+    # Copy the reminders into past_reminders, then remove them from active_reminders
+    conn.executemany('''
+        INSERT INTO past_reminders (reminder_time, due_at, message, user_name, user_id, channel_name, channel_id, guild_id)
+        SELECT reminder_time, due_at, message, user_name, user_id, channel_name, channel_id, guild_id
+        FROM active_reminders WHERE id = ?
+    ''', id_rows)
+    conn.executemany('DELETE FROM active_reminders WHERE id = ?', id_rows)
 
 # Function to save reminders in database
-def save_reminder(date_str, time_str, message, user_name, user_id, channel_name, channel_id):
-    conn = None  # Initialize conn variable here
+async def save_reminder(date_str, time_str, message, user_name, user_id, channel_name, channel_id, guild_id=None, repeat=None):
     try:
-        # Combine date and time into a single string
-        date_time_str = f"{date_str} {time_str}"
-
-        # Parse the date and time, allowing flexible input (e.g., "1 Dec", "1", etc.)
-        reminder_time_pst = parser.parse(date_time_str, dayfirst=True)  # Handle day-first formats
-        
-        # If only the day was provided, use current month/year by default
+        # Parse the date and time, allowing flexible input (e.g., "1 Dec", "1", etc.);
+        # a missing month or year defaults to the current one
         now = datetime.now(PST)
-        if reminder_time_pst.year == 1900:  # If no year provided
-            reminder_time_pst = reminder_time_pst.replace(year=now.year)
-        if reminder_time_pst.month == 1 and reminder_time_pst.day == 1:  # If no month/day provided
-            reminder_time_pst = reminder_time_pst.replace(month=now.month, day=now.day)
+        reminder_time_local = parse_local_datetime(date_str, time_str, default=now)
+
+        # Recurring reminders store one rule (a preset or a cron expression) next to their first occurrence,
+        # which for a cron rule is the first time it matches at or after the given date and time
+        recurrence = None
+        if repeat:
+            try:
+                recurrence, reminder_time_local = build_recurrence(repeat, reminder_time_local)
+            except ValueError as e:
+                return False, f"Invalid repeat rule: {e}"
 
         # Localize to PST
-        reminder_time_pst = PST.localize(reminder_time_pst, is_dst=None)
+        reminder_time_pst = PST.localize(reminder_time_local, is_dst=None) if recurrence is None else localize_wall_time(PST, reminder_time_local)
 
         # Check if the reminder time is in the past
         if reminder_time_pst < now:
@@ -108,17 +393,10 @@ def save_reminder(date_str, time_str, message, user_name, user_id, channel_name,
         # Convert PST time to UTC for storage
         reminder_time_utc = reminder_time_pst.astimezone(UTC)
 
-        # Connect to the SQLite database
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
         # Insert the new reminder into the reminders table
-        cursor.execute('''
-            INSERT INTO active_reminders (reminder_time, message, user_name, user_id, channel_name, channel_id)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (reminder_time_utc.isoformat(), message, user_name, user_id, channel_name, channel_id))
+        reminder_id = await reminder_store.run(_insert_reminder, reminder_time_utc.isoformat(), message, user_name, user_id, channel_name, channel_id, guild_id, recurrence)
 
-        conn.commit()
+        notify_schedule_change(reminder_id, reminder_time_utc)
         print(f"Reminder saved successfully for {reminder_time_pst.strftime('%d %b %Y %H:%M %Z')}.")
         return True, reminder_time_pst  # Return success and the localized reminder time for confirmation
 
@@ -126,60 +404,115 @@ def save_reminder(date_str, time_str, message, user_name, user_id, channel_name,
         print(f"Error saving reminder: {e}")
         return False, f"Error saving reminder: {e}"
 
-    finally:
-        # Only close the connection if it was successfully established
-        if conn:
-            conn.close()
+def _insert_reminder(conn, reminder_time, message, user_name, user_id, channel_name, channel_id, guild_id, recurrence):
+    with conn:
+        cursor = conn.execute('''
+            INSERT INTO active_reminders (reminder_time, due_at, message, user_name, user_id, channel_name, channel_id, guild_id, recurrence)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (reminder_time, to_epoch(reminder_time), message, user_name, user_id, channel_name, channel_id, guild_id, recurrence))
+    return cursor.lastrowid
 
 # /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/
 
+# Columns a reminder listing can be scoped by
+REMINDER_SCOPES = ('user_id', 'channel_id', 'guild_id')
+
+# Function to fill in the guild of reminders saved before guild ids were stored; channel_guilds maps channel id -> guild id
+async def backfill_reminder_guilds(channel_guilds):
+    return await reminder_store.run(_backfill_reminder_guilds, channel_guilds)
+
+def _backfill_reminder_guilds(conn, channel_guilds):
+    rows = [(guild_id, channel_id) for channel_id, guild_id in channel_guilds.items()]
+    with conn:
+        for table in ('active_reminders', 'past_reminders'):
+            conn.executemany(f'UPDATE {table} SET guild_id = ? WHERE channel_id = ? AND guild_id IS NULL', rows)
+
+# Function to list the channels that have reminders without a guild id
+async def get_channels_missing_guild():
+    return await reminder_store.run(_get_channels_missing_guild)
+
+def _get_channels_missing_guild(conn):
+    rows = conn.execute('''SELECT channel_id FROM active_reminders WHERE guild_id IS NULL
+                           UNION SELECT channel_id FROM past_reminders WHERE guild_id IS NULL''').fetchall()
+    return [row[0] for row in rows]
+
 # Function to fetch active reminders (future reminders)
-def get_active_reminders():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    # Fetch reminders that are due after the specified time (i.e., future reminders)
-    cursor.execute('''SELECT id, reminder_time, message, user_name, user_id, channel_name, channel_id 
-                      FROM active_reminders''')
-    
-    # Convert tuples to dictionaries
-    columns = [column[0] for column in cursor.description]  # Get column names
-    active_reminders = [dict(zip(columns, row)) for row in cursor.fetchall()]
-    
-    conn.close()
-    return active_reminders
+async def get_active_reminders():
+    return await reminder_store.run(_fetch_reminders, 'active_reminders')
 
 # Function to fetch past reminders (already triggered)
-def get_past_reminders():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    # Fetch all reminders from past_reminders table
-    cursor.execute('''SELECT id, reminder_time, message, user_name, user_id, channel_name, channel_id 
-                      FROM past_reminders''')
-    
+async def get_past_reminders():
+    return await reminder_store.run(_fetch_reminders, 'past_reminders')
+
+def _fetch_reminders(conn, table):
+    cursor = conn.execute(f'''SELECT id, reminder_time, message, user_name, user_id, channel_name, channel_id
+                              FROM {table}''')
+
     # Convert tuples to dictionaries
     columns = [column[0] for column in cursor.description]  # Get column names
-    past_reminders = [dict(zip(columns, row)) for row in cursor.fetchall()]
-    
-    conn.close()
-    return past_reminders
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+# Function to fetch one page of reminders ordered by (due_at, id), continuing after or before a page key.
+# `scope` is (column, value) limiting the page to one user, channel or guild; `since`/`until` bound the due time.
+# Returns (reminders, has_more); with neither key given, `backward` starts from the last page.
+async def get_reminder_page(table, limit, after=None, before=None, backward=False, scope=None, since=None, until=None):
+    return await reminder_store.run(_fetch_reminder_page, table, limit, after, before, backward, scope,
+                                    None if since is None else to_epoch(since), None if until is None else to_epoch(until))
+
+def _fetch_reminder_page(conn, table, limit, after, before, backward, scope, since, until):
+    if table not in ('active_reminders', 'past_reminders'):
+        raise ValueError(f"Unknown reminder table: {table}")
+
+    # Keyset pagination: seek straight to the page through the (scope, due_at) index instead of OFFSET
+    backward = backward or before is not None
+    conditions = []
+    params = []
+    if scope is not None:
+        column, value = scope
+        if column not in REMINDER_SCOPES:
+            raise ValueError(f"Unknown reminder scope: {column}")
+        conditions.append(f'{column} = ?')
+        params.append(value)
+    if since is not None:
+        conditions.append('due_at >= ?')
+        params.append(since)
+    if until is not None:
+        conditions.append('due_at < ?')
+        params.append(until)
+    if after is not None:
+        conditions.append('(due_at, id) > (?, ?)')
+        params.extend(after)
+    elif before is not None:
+        conditions.append('(due_at, id) < (?, ?)')
+        params.extend(before)
+
+    query = f'''SELECT id, reminder_time, message, user_name, user_id, channel_name, channel_id, due_at, recurrence
+                 FROM {table}'''
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY due_at DESC, id DESC' if backward else ' ORDER BY due_at, id'
+    query += ' LIMIT ?'
+    params.append(limit + 1)  # One extra row tells us whether another page follows
+
+    cursor = conn.execute(query, params)
+    columns = [column[0] for column in cursor.description]
+    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backward:
+        rows.reverse()
+    return rows, has_more
 
 # /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/
 
 # Function to remove active reminder from database using id
-def remove_reminder(reminder_id):
-    conn = None
+async def remove_reminder(reminder_id):
     try:
-        # Connect to the SQLite database
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
         # Delete the reminder from the active_reminders table
-        cursor.execute('DELETE FROM active_reminders WHERE id = ?', (reminder_id,))
+        removed = await reminder_store.run(_delete_reminder, reminder_id)
 
-        if cursor.rowcount > 0:
-            conn.commit()
+        if removed:
+            notify_schedule_change(reminder_id, None)
             return True, "Reminder removed successfully."
         else:
             return False, "No reminder found with the given index."
@@ -187,65 +520,74 @@ def remove_reminder(reminder_id):
     except Exception as e:
         return False, f"Error removing reminder: {e}"
 
-    finally:
-        if conn:
-            conn.close()
+def _delete_reminder(conn, reminder_id):
+    with conn:
+        cursor = conn.execute('DELETE FROM active_reminders WHERE id = ?', (reminder_id,))
+    return cursor.rowcount > 0
 
 # /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/
 
 # Function to edit active reminder from database using id
-def edit_reminder(reminder_id, new_date=None, new_time=None, new_message=None):
-    conn = None
+async def edit_reminder(reminder_id, new_date=None, new_time=None, new_message=None):
     try:
-        # Connect to the SQLite database
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
         # Fetch the current reminder details
-        cursor.execute('SELECT reminder_time, message FROM active_reminders WHERE id = ?', (reminder_id,))
-        reminder = cursor.fetchone()
+        reminder = await reminder_store.run(_fetch_reminder_time_and_message, reminder_id)
 
         if not reminder:
             return False, "No reminder found with the given index."
 
         current_time_utc = reminder[0]
         current_message = reminder[1]
+        recurrence = reminder[2]
 
         # Parse new reminder time if provided
         if new_date or new_time:
-            current_reminder_time = parser.parse(current_time_utc).astimezone(PST)
+            current_reminder_time = parse_stored_time(current_time_utc).astimezone(PST)
 
             # Use provided date or time or fallback to current ones
             date_to_use = new_date if new_date else current_reminder_time.strftime("%d %b %Y")
             time_to_use = new_time if new_time else current_reminder_time.strftime("%H:%M")
 
-            date_time_str = f"{date_to_use} {time_to_use}"
-            reminder_time_pst = parser.parse(date_time_str, dayfirst=True)
-            reminder_time_pst = PST.localize(reminder_time_pst)
+            reminder_time_local = parse_local_datetime(date_to_use, time_to_use, default=current_reminder_time)
+
+            # A recurring reminder's rule carries its time, so the rule moves with it
+            if recurrence:
+                try:
+                    recurrence, reminder_time_local = rebuild_recurrence(recurrence, current_reminder_time.replace(tzinfo=None), reminder_time_local)
+                except ValueError as e:
+                    return False, f"Can't change the time of this repeating reminder: {e}"
+            reminder_time_pst = localize_wall_time(PST, reminder_time_local) if recurrence else PST.localize(reminder_time_local)
 
             # Convert reminder time to UTC
             new_reminder_time_utc = reminder_time_pst.astimezone(UTC)
         else:
-            new_reminder_time_utc = current_time_utc
+            new_reminder_time_utc = parse_stored_time(current_time_utc)
 
         # Use provided message or fallback to current one
         new_message = new_message if new_message else current_message
 
         # Update the reminder in the active_reminders table
-        cursor.execute('''
-            UPDATE active_reminders
-            SET reminder_time = ?, message = ?
-            WHERE id = ?
-        ''', (new_reminder_time_utc.isoformat(), new_message, reminder_id))
+        updated = await reminder_store.run(_update_reminder, reminder_id, new_reminder_time_utc.isoformat(), new_message, recurrence)
+        if not updated:
+            return False, "No reminder found with the given index."
 
-        conn.commit()
+        notify_schedule_change(reminder_id, new_reminder_time_utc)
         return True, "Reminder updated successfully."
 
     except Exception as e:
         return False, f"Error editing reminder: {e}"
 
-    finally:
-        if conn:
-            conn.close()
+def _fetch_reminder_time_and_message(conn, reminder_id):
+    cursor = conn.execute('SELECT reminder_time, message, recurrence FROM active_reminders WHERE id = ?', (reminder_id,))
+    return cursor.fetchone()
+
+def _update_reminder(conn, reminder_id, reminder_time, message, recurrence):
+    with conn:
+        cursor = conn.execute('''
+            UPDATE active_reminders
+            SET reminder_time = ?, due_at = ?, message = ?, recurrence = ?
+            WHERE id = ?
+        ''', (reminder_time, to_epoch(reminder_time), message, recurrence, reminder_id))
+    return cursor.rowcount > 0
 
-# /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/
\ No newline at end of file
+# /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/
@@ -0,0 +1,239 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+import aiohttp
+import discord
+from reminder_commands import get_pending_outbox_messages, record_outbox_retry, complete_outbox_messages
+
+# How long a channel fetched over REST is reused, and how many are kept
+CHANNEL_CACHE_TTL = 10 * 60
+CHANNEL_CACHE_SIZE = 1024
+
+# Outbox worker settings
+OUTBOX_MAX_CONCURRENT_SENDS = 10  # Sends in flight across all channels
+OUTBOX_MAX_ATTEMPTS = 6  # Attempts before a message is dead-lettered
+OUTBOX_BACKOFF_BASE = 2  # Seconds before the first retry, doubled for each later one
+OUTBOX_BACKOFF_MAX = 300
+OUTBOX_FLUSH_DELAY = 0.5  # Finished messages are written back to the database in batches this often
+
+# Discord lets a bot post 5 messages per 5 seconds in a channel; pace sends to stay inside that bucket
+CHANNEL_SEND_LIMIT = 5
+CHANNEL_SEND_PERIOD = 5
+
+# Discord's message length limit
+MESSAGE_CHAR_LIMIT = 2000
+
+# Seconds to gather reminders for the same channel into one digest message (0 sends each reminder on its own)
+REMINDER_DIGEST_WINDOW = float(os.getenv('REMINDER_DIGEST_WINDOW', '0'))
+
+# Function to build a user mention from the stored id (no user fetch needed)
+def user_mention(user_id):
+    return f"<@{user_id}>"
+
+# Resolves channel ids for reminder delivery: gateway cache first, then a TTL/LRU of REST fetches
+class ChannelResolver:
+    def __init__(self, bot, ttl=CHANNEL_CACHE_TTL, max_size=CHANNEL_CACHE_SIZE):
+        self.bot = bot
+        self.ttl = ttl
+        self.max_size = max_size
+        self._cache = OrderedDict()  # channel id -> (expires at, channel)
+        self._pending = {}  # channel id -> fetch task shared by concurrent deliveries
+
+    async def get_channel(self, channel_id):
+        # Channels the gateway already knows about cost nothing
+        channel = self.bot.get_channel(channel_id)
+        if channel is not None:
+            return channel
+
+        entry = self._cache.get(channel_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self._cache.move_to_end(channel_id)
+            return entry[1]
+
+        # Only one REST fetch per channel, however many reminders are waiting on it
+        task = self._pending.get(channel_id)
+        if task is None:
+            task = asyncio.ensure_future(self.bot.fetch_channel(channel_id))
+            self._pending[channel_id] = task
+            task.add_done_callback(lambda _: self._pending.pop(channel_id, None))
+        channel = await asyncio.shield(task)
+
+        self._cache[channel_id] = (time.monotonic() + self.ttl, channel)
+        self._cache.move_to_end(channel_id)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+        return channel
+
+    # Function to forget a channel, e.g. after Discord reports it deleted
+    def invalidate(self, channel_id):
+        self._cache.pop(channel_id, None)
+
+# /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/
+
+# Function to split text into pieces that fit in one Discord message, preferring line breaks
+def split_message(text, limit=MESSAGE_CHAR_LIMIT):
+    pieces = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit + 1)
+        if cut <= 0:
+            cut = limit
+        pieces.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    if text:
+        pieces.append(text)
+    return pieces
+
+# Function to take the messages at the head of a channel queue that can go out as one digest
+def take_digest(queue, limit=MESSAGE_CHAR_LIMIT):
+    batch = [queue[0]]
+    length = len(queue[0]['content'])
+    for message in list(queue)[1:]:
+        # Messages still waiting on a retry, or that would overflow the limit, start the next digest
+        if message['attempts'] or length + 1 + len(message['content']) > limit:
+            break
+        batch.append(message)
+        length += 1 + len(message['content'])
+    return batch
+
+# Function to decide whether a failed send is worth retrying
+def is_transient_error(error):
+    if isinstance(error, (discord.Forbidden, discord.NotFound)):
+        return False  # Missing access or a deleted channel will not fix itself
+    if isinstance(error, discord.HTTPException):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError, OSError))
+
+# Sends queued reminder messages: one ordered queue per channel, channels drained concurrently
+class ReminderOutbox:
+    def __init__(self, resolver, digest_window=REMINDER_DIGEST_WINDOW):
+        self.resolver = resolver
+        self.digest_window = digest_window
+        self._queues = {}  # channel id -> deque of outbox messages
+        self._drains = {}  # channel id -> task draining that channel's queue
+        self._send_times = {}  # channel id -> monotonic times of the most recent sends
+        self._semaphore = asyncio.Semaphore(OUTBOX_MAX_CONCURRENT_SENDS)
+        self._sent = []
+        self._dead = []
+        self._flush_task = None
+        self._queued = 0  # Messages waiting across all channel queues
+        self._capacity = asyncio.Event()  # Set whenever messages leave the queues
+
+    # Function to pick up messages a previous run queued but never finished
+    async def start(self):
+        self.submit(await get_pending_outbox_messages())
+
+    # Function to queue outbox messages for delivery
+    def submit(self, messages):
+        for message in messages:
+            channel_id = message['channel_id']
+            self._queues.setdefault(channel_id, deque()).append(message)
+            self._queued += 1
+            if channel_id not in self._drains:
+                self._drains[channel_id] = asyncio.create_task(self._drain(channel_id))
+
+    async def _drain(self, channel_id):
+        queue = self._queues[channel_id]
+        try:
+            # The head stays queued until it is settled, so a channel's messages go out in order
+            while queue:
+                if self.digest_window:
+                    # Give reminders due at nearly the same moment a chance to join this digest
+                    if not queue[0]['attempts']:
+                        await asyncio.sleep(self.digest_window)
+                    batch = take_digest(queue)
+                else:
+                    batch = [queue[0]]
+                await self._deliver(batch)
+                for _ in batch:
+                    queue.popleft()
+                self._queued -= len(batch)
+                self._capacity.set()
+        finally:
+            del self._drains[channel_id]
+            if not queue:
+                del self._queues[channel_id]
+
+    # Function to wait until fewer than `limit` messages are queued, so producers can stream large backlogs
+    async def wait_for_capacity(self, limit):
+        while self._queued >= limit:
+            self._capacity.clear()
+            await self._capacity.wait()
+
+    async def _pace(self, channel_id):
+        send_times = self._send_times.setdefault(channel_id, deque(maxlen=CHANNEL_SEND_LIMIT))
+        if len(send_times) == CHANNEL_SEND_LIMIT:
+            wait = send_times[0] + CHANNEL_SEND_PERIOD - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        send_times.append(time.monotonic())
+
+    # Function to send a batch of messages as one post (split only where Discord's limit forces it),
+    # retrying transient failures with exponential backoff
+    async def _deliver(self, batch):
+        head = batch[0]
+        channel_id = head['channel_id']
+        pieces = split_message("\n".join(message['content'] for message in batch))
+        while True:
+            delay = head['next_attempt_at'] - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            try:
+                for piece in pieces:
+                    await self._pace(channel_id)
+                    async with self._semaphore:
+                        channel = await self.resolver.get_channel(channel_id)
+                        await channel.send(piece)
+                self._finish(batch, self._sent)
+                return
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"[:500]
+                for message in batch:
+                    message['attempts'] += 1
+                    message['last_error'] = error
+
+                if not is_transient_error(e) or head['attempts'] >= OUTBOX_MAX_ATTEMPTS:
+                    print(f"Giving up on {len(batch)} reminder message(s) for channel {channel_id}: {error}")
+                    if isinstance(e, discord.NotFound):
+                        self.resolver.invalidate(channel_id)
+                    self._finish(batch, self._dead)
+                    return
+
+                backoff = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * 2 ** (head['attempts'] - 1))
+                print(f"Error sending {len(batch)} reminder message(s) for channel {channel_id}, retrying in {backoff}s: {error}")
+                for message in batch:
+                    message['next_attempt_at'] = time.time() + backoff
+                    try:
+                        await record_outbox_retry(message['id'], message['attempts'], int(message['next_attempt_at']), error)
+                    except Exception as db_error:
+                        print(f"Error recording reminder retry: {db_error}")
+
+    def _finish(self, batch, results):
+        results.extend(batch)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush(OUTBOX_FLUSH_DELAY))
+
+    # Function to write finished messages back in one transaction
+    async def _flush(self, delay=0):
+        await asyncio.sleep(delay)
+        sent, dead = self._sent, self._dead
+        self._sent, self._dead = [], []
+        self._flush_task = None
+        try:
+            await complete_outbox_messages(sent, dead)
+        except Exception as e:
+            print(f"Error settling reminder messages: {e}")
+            self._sent[:0] = sent
+            self._dead[:0] = dead
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush(OUTBOX_FLUSH_DELAY))
+
+    # Function to stop sending and write back whatever has already finished
+    async def close(self):
+        for task in list(self._drains.values()):
+            task.cancel()
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self._flush()
@@ -0,0 +1,152 @@
+import discord
+from date_parsing import parse_stored_time
+from reminder_commands import PST, get_reminder_page
+from reminder_recurrence import describe_recurrence
+
+# Most reminders shown per page of /reminders_list
+REMINDER_LIST_PAGE_SIZE = 10
+# Longest reminder message shown in the list
+REMINDER_LIST_PREVIEW_CHARS = 150
+# Characters of entries per page, leaving room for the heading within Discord's 2000 character limit
+REMINDER_LIST_PAGE_CHARS = 1900
+# Seconds the Prev/Next buttons stay usable
+REMINDER_LIST_TIMEOUT = 300
+
+# Tables listed for each /reminders_list choice, with the heading shown for each
+REMINDER_LIST_SECTIONS = {
+    "active": [("active_reminders", "Active Reminders")],
+    "past": [("past_reminders", "Past Reminders")],
+    "both": [("active_reminders", "Active Reminders"), ("past_reminders", "Past Reminders")],
+}
+
+# Function to format one reminder for the list
+def format_reminder_entry(reminder):
+    reminder_time_pst = parse_stored_time(reminder['reminder_time']).astimezone(PST)
+    message = reminder['message']
+    if len(message) > REMINDER_LIST_PREVIEW_CHARS:
+        message = message[:REMINDER_LIST_PREVIEW_CHARS - 3] + "..."
+    repeats = f"**Repeats:** {describe_recurrence(reminder['recurrence'])}\n" if reminder['recurrence'] else ""
+    return (f"**ID:** {reminder['id']}\n**Reminder Message:** {message}\n"
+            f"**Time:** {reminder_time_pst.strftime('%d %b %Y %H:%M %Z')}\n{repeats}"
+            f"**User:** {reminder['user_name']}\n**Channel:** {reminder['channel_name']}\n\n")
+
+# Function to get the keyset position of a reminder
+def page_key(reminder):
+    return reminder['due_at'], reminder['id']
+
+# Function to keep as many reminders as fit in one page, counted from the start (or from the end, for a page
+# fetched backwards); returns (reminders shown, whether any were left out)
+def fit_page(reminders, from_end=False):
+    shown = []
+    used = 0
+    for reminder in (reversed(reminders) if from_end else reminders):
+        length = len(format_reminder_entry(reminder))
+        if shown and used + length > REMINDER_LIST_PAGE_CHARS:
+            break
+        shown.append(reminder)
+        used += length
+    if from_end:
+        shown.reverse()
+    return shown, len(shown) < len(reminders)
+
+# One page of reminders with Prev/Next buttons; each press fetches only the page it shows
+class ReminderListView(discord.ui.View):
+    def __init__(self, reminder_type, scope=None, since=None, until=None, page_size=REMINDER_LIST_PAGE_SIZE):
+        super().__init__(timeout=REMINDER_LIST_TIMEOUT)
+        self.sections = REMINDER_LIST_SECTIONS[reminder_type]
+        self.filters = {'scope': scope, 'since': since, 'until': until}  # Passed to every page query
+        self.page_size = page_size
+        self.section = 0
+        self.page_number = 1
+        self.reminders = []
+        self.has_prev = False
+        self.has_next = False
+        self.section_pages = {}  # section -> pages it had when paging moved past it, for numbering on the way back
+        self.interaction = None  # Interaction that posted the list, used to disable the buttons on timeout
+
+    # Function to load the first page; returns False when every section is empty
+    async def load_first_page(self):
+        for section in range(len(self.sections)):
+            reminders, has_more = await get_reminder_page(self.sections[section][0], self.page_size, **self.filters)
+            if reminders:
+                self._show(section, 1, reminders, more_before=False, more_after=has_more)
+                return True
+        return False
+
+    # Function to show a fetched page, trimmed to what fits in a message; more_before/more_after say whether
+    # the section has reminders before or after the fetched rows
+    def _show(self, section, page_number, reminders, more_before, more_after, from_end=False):
+        reminders, trimmed = fit_page(reminders, from_end)
+        more_before = more_before or (trimmed and from_end)
+        more_after = more_after or (trimmed and not from_end)
+        self.section = section
+        self.page_number = max(page_number, 2) if more_before else 1
+        self.reminders = reminders
+        self.has_prev = more_before or section > 0
+        self.has_next = more_after or section < len(self.sections) - 1
+        self.prev_button.disabled = not self.has_prev
+        self.next_button.disabled = not self.has_next
+
+    def render(self):
+        heading = self.sections[self.section][1]
+        entries = "".join(format_reminder_entry(reminder) for reminder in self.reminders)
+        return f"**{heading} (Page {self.page_number})**\n```\n{entries}\n```"
+
+    async def _next_page(self):
+        table = self.sections[self.section][0]
+        reminders, has_more = await get_reminder_page(table, self.page_size, after=page_key(self.reminders[-1]), **self.filters)
+        if reminders:
+            self._show(self.section, self.page_number + 1, reminders, more_before=True, more_after=has_more)
+            return True
+
+        # This section is done; continue with the first page of the next one that has reminders
+        for section in range(self.section + 1, len(self.sections)):
+            reminders, has_more = await get_reminder_page(self.sections[section][0], self.page_size, **self.filters)
+            if reminders:
+                self.section_pages[self.section] = self.page_number
+                self._show(section, 1, reminders, more_before=False, more_after=has_more)
+                return True
+        self.has_next = False
+        self.next_button.disabled = True
+        return False
+
+    async def _prev_page(self):
+        table = self.sections[self.section][0]
+        reminders, has_more = await get_reminder_page(table, self.page_size, before=page_key(self.reminders[0]), **self.filters)
+        if reminders:
+            self._show(self.section, self.page_number - 1, reminders, more_before=has_more, more_after=True, from_end=True)
+            return True
+
+        # Back to the last page of the previous section that has reminders
+        for section in range(self.section - 1, -1, -1):
+            reminders, has_more = await get_reminder_page(self.sections[section][0], self.page_size, backward=True, **self.filters)
+            if reminders:
+                self._show(section, self.section_pages.get(section, 1), reminders, more_before=has_more, more_after=False, from_end=True)
+                return True
+        self.has_prev = False
+        self.prev_button.disabled = True
+        return False
+
+    @discord.ui.button(label="Prev", style=discord.ButtonStyle.secondary, disabled=True)
+    async def prev_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._prev_page()
+        await interaction.response.edit_message(content=self.render(), view=self)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary, disabled=True)
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._next_page()
+        await interaction.response.edit_message(content=self.render(), view=self)
+
+    async def on_error(self, interaction: discord.Interaction, error: Exception, item):
+        print(f"Error paging reminders: {error}")
+        if not interaction.response.is_done():
+            await interaction.response.send_message("An error occurred while fetching reminders.", ephemeral=True)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.interaction is not None:
+            try:
+                await self.interaction.edit_original_response(view=self)
+            except discord.HTTPException:
+                pass
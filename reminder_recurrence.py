@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+import pytz
+
+# A recurring reminder is stored as one row holding a 5-field cron rule ("minute hour day month weekday",
+# weekday 0 = Sunday); only the next occurrence is ever stored, and it is worked out again each time the reminder fires.
+
+# Named schedules, anchored on the wall-clock time of the first occurrence
+RECURRENCE_PRESETS = ("daily", "weekdays", "weekly", "monthly")
+
+CRON_FIELD_RANGES = (
+    (0, 59),  # minute
+    (0, 23),  # hour
+    (1, 31),  # day of month
+    (1, 12),  # month
+    (0, 7),   # day of week, 0 and 7 are both Sunday
+)
+
+# How far ahead to search for the next occurrence (covers rules like "every 29 Feb that is a Monday")
+MAX_SEARCH_DAYS = 366 * 28
+
+# Function to parse one cron field into the sorted values it allows
+def parse_cron_field(field, low, high):
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_str = part.split("/", 1)
+            step = int(step_str)
+            if step < 1:
+                raise ValueError(f"Invalid step in '{field}'.")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(value) for value in part.split("-", 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"'{field}' is outside {low}-{high}.")
+        values.update(range(start, end + 1, step))
+    return sorted(values)
+
+# Parsed cron rule; day of month and day of week follow cron's rule of matching either one when both are restricted
+class CronRule:
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError("A cron rule needs 5 fields: minute hour day month weekday.")
+        self.expression = " ".join(fields)
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            parse_cron_field(field, low, high) for field, (low, high) in zip(fields, CRON_FIELD_RANGES))
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def matches_day(self, day):
+        if day.month not in self.months:
+            return False
+        day_match = day.day in self.days
+        weekday_match = (day.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_match and weekday_match
+        return day_match or weekday_match
+
+    # Function to find the first wall-clock minute strictly after `after` (naive local time) that matches the rule
+    def next_after(self, after):
+        start = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.date()
+        for _ in range(MAX_SEARCH_DAYS):
+            if self.matches_day(day):
+                for hour in self.hours:
+                    if day == start.date() and hour < start.hour:
+                        continue
+                    for minute in self.minutes:
+                        if day == start.date() and hour == start.hour and minute < start.minute:
+                            continue
+                        return datetime(day.year, day.month, day.day, hour, minute)
+            day += timedelta(days=1)
+        raise ValueError(f"'{self.expression}' never occurs.")
+
+# Function to turn a /reminder repeat option into the cron rule stored with the reminder, and its first occurrence
+# at or after `first_local` (naive local time); presets take their time (and weekday or day of month) from `first_local`.
+# Raises ValueError for a rule that is invalid or never occurs.
+def build_recurrence(repeat, first_local):
+    repeat = repeat.strip().lower()
+    minute, hour = first_local.minute, first_local.hour
+    if repeat == "daily":
+        rule = f"{minute} {hour} * * *"
+    elif repeat == "weekdays":
+        rule = f"{minute} {hour} * * 1-5"
+    elif repeat == "weekly":
+        rule = f"{minute} {hour} * * {(first_local.weekday() + 1) % 7}"
+    elif repeat == "monthly":
+        rule = f"{minute} {hour} {first_local.day} * *"  # Like cron, months without that day are skipped
+    else:
+        rule = repeat
+    cron_rule = CronRule(rule)
+    return cron_rule.expression, cron_rule.next_after(first_local - timedelta(minutes=1))
+
+# Function to move a stored preset rule to a new first occurrence; custom cron rules have no anchor time
+# to move, so they raise ValueError
+def rebuild_recurrence(rule, current_local, new_local):
+    for preset in RECURRENCE_PRESETS:
+        if build_recurrence(preset, current_local)[0] == rule:
+            return build_recurrence(preset, new_local)
+    raise ValueError("a reminder on a custom cron rule can't be moved; remove it and set it again.")
+
+# Function to attach a time zone to a wall-clock time, moving times skipped by a DST change forward
+def localize_wall_time(tz, wall_time):
+    try:
+        return tz.localize(wall_time, is_dst=None)
+    except pytz.NonExistentTimeError:
+        return tz.normalize(tz.localize(wall_time, is_dst=False))
+    except pytz.AmbiguousTimeError:
+        return tz.localize(wall_time, is_dst=False)  # A repeated hour fires once, at its second occurrence
+
+# Function to compute the next occurrence after `after_utc`, evaluating the rule on the wall clock of `tz`; returns UTC
+def next_occurrence(rule, after_utc, tz):
+    after_local = after_utc.astimezone(tz).replace(tzinfo=None)
+    next_local = CronRule(rule).next_after(after_local)
+    return localize_wall_time(tz, next_local).astimezone(pytz.UTC)
+
+# Function to describe a stored rule for listings
+def describe_recurrence(rule):
+    minute, hour, day, month, weekday = rule.split()
+    at = f"{int(hour):02d}:{int(minute):02d}" if minute.isdigit() and hour.isdigit() else None
+    if at and day == "*" and month == "*":
+        if weekday == "*":
+            return f"daily at {at}"
+        if weekday == "1-5":
+            return f"weekdays at {at}"
+        if weekday.isdigit():
+            names = ("Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday")
+            return f"weekly on {names[int(weekday) % 7]} at {at}"
+    if at and day.isdigit() and month == "*" and weekday == "*":
+        return f"monthly on day {day} at {at}"
+    return f"cron {rule}"
@@ -0,0 +1,111 @@
+import gzip
+import json
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from reminder_commands import DB_PATH, reminder_store
+
+# Days a past reminder stays in the database before it is rolled into a monthly archive file (0 keeps everything)
+REMINDER_RETENTION_DAYS = int(os.getenv('REMINDER_RETENTION_DAYS', '90'))
+
+# Compressed monthly archives of pruned past reminders, one JSON object per line
+ARCHIVE_DIR = os.path.join(os.path.dirname(DB_PATH), "archive")
+
+# Rows archived per transaction, so a large backlog never holds the database for long
+ARCHIVE_BATCH_SIZE = 1000
+
+# Free pages handed back to the file system per incremental vacuum step
+VACUUM_PAGES_PER_STEP = 2000
+
+PAST_REMINDER_COLUMNS = ('id', 'reminder_time', 'due_at', 'message', 'user_name', 'user_id',
+                         'channel_name', 'channel_id', 'guild_id', 'recurrence')
+
+# Function to get the archive file for the month a reminder was due in
+def archive_path(due_at, archive_dir=ARCHIVE_DIR):
+    month = datetime.fromtimestamp(due_at, timezone.utc).strftime('%Y-%m')
+    return os.path.join(archive_dir, f"past_reminders-{month}.jsonl.gz")
+
+# Function to append rows to their monthly archives; each append adds a gzip member, which gzip.open reads back as one stream
+def write_archive_rows(rows, archive_dir=ARCHIVE_DIR):
+    by_file = defaultdict(list)
+    for row in rows:
+        by_file[archive_path(row['due_at'], archive_dir)].append(row)
+
+    os.makedirs(archive_dir, exist_ok=True)
+    for path, file_rows in by_file.items():
+        with open(path, 'ab') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb') as archive:
+                archive.write("".join(json.dumps(row) + "\n" for row in file_rows).encode())
+            raw.flush()
+            os.fsync(raw.fileno())  # The rows are deleted from the database right after this
+
+# Function to move one batch of expired past reminders into the archives; returns how many were moved
+def _archive_past_reminders(conn, cutoff, limit, archive_dir):
+    cursor = conn.execute(f'''SELECT {", ".join(PAST_REMINDER_COLUMNS)} FROM past_reminders
+                              WHERE due_at < ? ORDER BY due_at, id LIMIT ?''', (cutoff, limit))
+    rows = [dict(zip(PAST_REMINDER_COLUMNS, row)) for row in cursor.fetchall()]
+    if not rows:
+        return 0
+
+    # Written before the delete: a crash in between can only leave a row in both places, never in neither
+    write_archive_rows(rows, archive_dir)
+    with conn:
+        conn.executemany('DELETE FROM past_reminders WHERE id = ?', [(row['id'],) for row in rows])
+    return len(rows)
+
+# Function to drop outbox messages that were given up on before the cutoff
+def _prune_dead_outbox(conn, cutoff):
+    with conn:
+        return conn.execute("DELETE FROM reminder_outbox WHERE status = 'dead' AND created_at < ?", (cutoff,)).rowcount
+
+# Function to return some free pages to the file system; returns the free pages left. Run as a script because
+# stepping the pragma through execute() frees only one page per call.
+def _incremental_vacuum(conn, pages):
+    conn.executescript(f'PRAGMA incremental_vacuum({int(pages)})')
+    return conn.execute('PRAGMA freelist_count').fetchone()[0]
+
+# Function to apply the retention policy: archive expired past reminders in batches, then reclaim the freed space
+async def prune_past_reminders(retention_days=REMINDER_RETENTION_DAYS, archive_dir=ARCHIVE_DIR):
+    if retention_days <= 0:
+        return 0
+
+    cutoff = int(time.time()) - retention_days * 86400
+    archived = 0
+    while True:
+        moved = await reminder_store.run(_archive_past_reminders, cutoff, ARCHIVE_BATCH_SIZE, archive_dir)
+        archived += moved
+        if moved < ARCHIVE_BATCH_SIZE:
+            break
+    dropped = await reminder_store.run(_prune_dead_outbox, cutoff)
+
+    # Vacuum in steps so other reminder queries get the database thread in between
+    while await reminder_store.run(_incremental_vacuum, VACUUM_PAGES_PER_STEP):
+        pass
+
+    if archived or dropped:
+        print(f"Archived {archived} past reminders older than {retention_days} days, dropped {dropped} dead outbox messages.")
+    return archived
+
+# /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/
+
+def _storage_stats(conn):
+    page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+    stats = {
+        'page_count': conn.execute('PRAGMA page_count').fetchone()[0],
+        'freelist_count': conn.execute('PRAGMA freelist_count').fetchone()[0],
+        'page_size': page_size,
+    }
+    for table in ('active_reminders', 'past_reminders', 'reminder_outbox'):
+        stats[table] = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+    return stats
+
+# Function to report database and archive sizes for the storage command
+async def get_storage_usage(db_path=DB_PATH, archive_dir=ARCHIVE_DIR):
+    stats = await reminder_store.run(_storage_stats)
+
+    stats['db_bytes'] = sum(os.path.getsize(path) for path in (db_path, db_path + "-wal") if os.path.exists(path))
+    archives = [os.path.join(archive_dir, name) for name in os.listdir(archive_dir)] if os.path.isdir(archive_dir) else []
+    stats['archive_files'] = len(archives)
+    stats['archive_bytes'] = sum(os.path.getsize(path) for path in archives)
+    return stats
@@ -0,0 +1,78 @@
+import asyncio
+import heapq
+import time
+from date_parsing import parse_stored_time
+
+# Longest single sleep; guards against wall-clock jumps while idle (seconds)
+MAX_SLEEP_SECONDS = 300
+
+# Function to turn a stored reminder time (ISO string or aware datetime) into a UTC epoch timestamp
+def to_timestamp(reminder_time):
+    if isinstance(reminder_time, str):
+        reminder_time = parse_stored_time(reminder_time)
+    return reminder_time.timestamp()
+
+# In-process scheduler that sleeps until the next reminder is due instead of polling the database
+class ReminderScheduler:
+    def __init__(self, deliver):
+        self._deliver = deliver  # Coroutine called with the ids of reminders that just came due
+        self._heap = []  # (due timestamp, reminder id); entries go stale when a reminder is edited or removed
+        self._due = {}  # reminder id -> current due timestamp
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def is_running(self):
+        return self._task is not None and not self._task.done()
+
+    # Function to load every active reminder and start the scheduling loop
+    def start(self, reminders):
+        for reminder in reminders:
+            self.schedule(reminder['id'], reminder['reminder_time'])
+        self._task = asyncio.create_task(self._run())
+
+    # Function to add or move a reminder; also used as the reminder_commands schedule listener
+    def schedule(self, reminder_id, reminder_time):
+        if reminder_time is None:
+            self.cancel(reminder_id)
+            return
+        due = to_timestamp(reminder_time)
+        self._due[reminder_id] = due
+        heapq.heappush(self._heap, (due, reminder_id))
+        self._wakeup.set()
+
+    def cancel(self, reminder_id):
+        if self._due.pop(reminder_id, None) is not None:
+            self._wakeup.set()
+
+    def _next_due(self):
+        # Drop heap entries left behind by edits and removals
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def _pop_due(self, now):
+        due_ids = []
+        while self._next_due() is not None and self._heap[0][0] <= now:
+            _, reminder_id = heapq.heappop(self._heap)
+            del self._due[reminder_id]
+            due_ids.append(reminder_id)
+        return due_ids
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            next_due = self._next_due()
+            delay = MAX_SLEEP_SECONDS if next_due is None else next_due - time.time()
+
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(delay, MAX_SLEEP_SECONDS))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due_ids = self._pop_due(time.time())
+            try:
+                await self._deliver(due_ids)
+            except Exception as e:
+                print(f"Error delivering reminders: {e}")
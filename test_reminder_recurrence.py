@@ -0,0 +1,46 @@
+from datetime import datetime
+import pytest
+import pytz
+from reminder_recurrence import CronRule, build_recurrence, next_occurrence, rebuild_recurrence
+
+PKT = pytz.timezone('Asia/Karachi')
+
+def test_cron_rule_next_after():
+    rule = CronRule("30 9 * * 1-5")
+    assert rule.next_after(datetime(2024, 9, 27, 9, 30)) == datetime(2024, 9, 30, 9, 30)  # Friday -> Monday
+    assert rule.next_after(datetime(2024, 9, 30, 9, 29)) == datetime(2024, 9, 30, 9, 30)
+
+def test_cron_rule_matches_day_or_weekday_when_both_restricted():
+    assert CronRule("0 9 13 * 5").next_after(datetime(2024, 9, 1)) == datetime(2024, 9, 6, 9, 0)
+
+@pytest.mark.parametrize("expression", ["0 9 * *", "60 9 * * *", "0 9 * * 1/0", "a b c d e"])
+def test_cron_rule_rejects_invalid_fields(expression):
+    with pytest.raises(ValueError):
+        CronRule(expression)
+
+# A rule that never fires used to be saved and then fail every claim transaction once due
+def test_build_recurrence_rejects_rule_that_never_occurs():
+    with pytest.raises(ValueError, match="never occurs"):
+        build_recurrence("0 9 31 2 *", datetime(2024, 9, 25, 14, 0))
+
+def test_build_recurrence_presets_start_at_given_time():
+    first = datetime(2024, 9, 25, 14, 0)  # A Wednesday
+    assert build_recurrence("daily", first) == ("0 14 * * *", first)
+    assert build_recurrence("weekly", first) == ("0 14 * * 3", first)
+    assert build_recurrence("monthly", first) == ("0 14 25 * *", first)
+
+def test_build_recurrence_cron_rule_starts_at_first_match():
+    assert build_recurrence("0 9 * * 1", datetime(2024, 9, 25, 14, 0)) == ("0 9 * * 1", datetime(2024, 9, 30, 9, 0))
+
+def test_rebuild_recurrence_moves_preset_time():
+    current = datetime(2024, 9, 25, 9, 0)
+    new = datetime(2024, 9, 25, 10, 30)
+    assert rebuild_recurrence("0 9 * * *", current, new) == ("30 10 * * *", new)
+
+def test_rebuild_recurrence_refuses_custom_rule():
+    with pytest.raises(ValueError):
+        rebuild_recurrence("0 9 * * 1,3", datetime(2024, 9, 30, 9, 0), datetime(2024, 9, 30, 10, 0))
+
+def test_next_occurrence_returns_utc():
+    after = pytz.UTC.localize(datetime(2024, 9, 25, 4, 0))  # 09:00 in Karachi
+    assert next_occurrence("0 9 * * *", after, PKT) == pytz.UTC.localize(datetime(2024, 9, 26, 4, 0))
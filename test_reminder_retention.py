@@ -0,0 +1,16 @@
+import sqlite3
+from reminder_retention import _incremental_vacuum
+
+def test_incremental_vacuum_frees_requested_pages(tmp_path):
+    conn = sqlite3.connect(tmp_path / "reminders.db")
+    conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+    conn.execute('CREATE TABLE filler (data TEXT)')
+    with conn:
+        conn.executemany('INSERT INTO filler VALUES (?)', [('x' * 3000,) for _ in range(600)])
+    with conn:
+        conn.execute('DELETE FROM filler')
+    free_before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    assert free_before > 400
+
+    assert _incremental_vacuum(conn, 200) == free_before - 200
+    assert _incremental_vacuum(conn, free_before) == 0
@@ -0,0 +1,73 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+import trello_webhook
+from trello_board import BoardState, board_state
+
+SECRET = "test-secret"
+CALLBACK_URL = "https://bot.example/trello/webhook"
+BOARD_ID = "board1"
+
+@pytest.fixture(autouse=True)
+def configured_board(monkeypatch):
+    monkeypatch.setattr(trello_webhook, 'TRELLO_API_SECRET', SECRET)
+    monkeypatch.setattr(trello_webhook, 'TRELLO_WEBHOOK_CALLBACK_URL', CALLBACK_URL)
+    monkeypatch.setattr(trello_webhook, 'TRELLO_BOARD_ID', BOARD_ID)
+    board_state.load([{'id': 'todo', 'name': 'To do', 'pos': 1}, {'id': 'done', 'name': 'Done', 'pos': 2}],
+                     [{'id': 'card1', 'name': 'Order # 100', 'idList': 'todo', 'due': None, 'pos': 1}],
+                     {'id': '5f0000000000000000000000', 'date': '2024-09-01T00:00:00.000Z'})
+
+def sign(body, secret=SECRET):
+    digest = hmac.new(secret.encode(), body + CALLBACK_URL.encode(), hashlib.sha1).digest()
+    return base64.b64encode(digest).decode()
+
+# Posts the payloads to a local webhook server, like Trello would; returns the response statuses
+def post_callbacks(*payloads, signature=sign):
+    async def run():
+        statuses = []
+        async with TestClient(TestServer(trello_webhook.create_webhook_app())) as client:
+            for payload in payloads:
+                body = json.dumps(payload).encode()
+                headers = {'X-Trello-Webhook': signature(body)} if signature else {}
+                response = await client.post(trello_webhook.TRELLO_WEBHOOK_PATH, data=body, headers=headers)
+                statuses.append(response.status)
+        return statuses
+    return asyncio.run(run())
+
+def callback(action_type, **data):
+    return {'model': {'id': BOARD_ID}, 'action': {'id': '600000000000000000000000', 'type': action_type, 'data': data}}
+
+def test_create_card_adds_order():
+    assert post_callbacks(callback('createCard', card={'id': 'card2', 'name': 'Order # 101'}, list={'id': 'todo'})) == [200]
+    assert board_state.order_index[101] == 'card2'
+
+def test_move_card_updates_list():
+    assert post_callbacks(callback('updateCard', card={'id': 'card1'}, listBefore={'id': 'todo'}, listAfter={'id': 'done'})) == [200]
+    assert board_state.order_index[100] == 'card1'
+    assert board_state.find_order(100)['idList'] == 'done'
+
+def test_archive_and_delete_remove_orders():
+    post_callbacks(callback('createCard', card={'id': 'card2', 'name': 'Order # 101'}, list={'id': 'todo'}))
+    assert post_callbacks(callback('updateCard', card={'id': 'card1', 'closed': True}, list={'id': 'todo'}),
+                          callback('deleteCard', card={'id': 'card2'}, list={'id': 'todo'})) == [200, 200]
+    assert 100 not in board_state.order_index
+    assert 101 not in board_state.order_index
+
+@pytest.mark.parametrize("signature", [None, lambda body: sign(body, "wrong-secret"), lambda body: "not base64"])
+def test_unsigned_or_badly_signed_callbacks_are_rejected(signature):
+    payload = callback('deleteCard', card={'id': 'card1'}, list={'id': 'todo'})
+    assert post_callbacks(payload, signature=signature) == [401]
+    assert board_state.order_index[100] == 'card1'
+
+def test_actions_during_a_reload_survive_an_older_download():
+    state = BoardState()
+    state.load([{'id': 'todo', 'name': 'To do', 'pos': 1}], [], None)
+    state.begin_load()
+    state.apply_action(callback('createCard', card={'id': 'card2', 'name': 'Order # 101'}, list={'id': 'todo'})['action'])
+    state.load([{'id': 'todo', 'name': 'To do', 'pos': 1}], [], {'id': '5f0000000000000000000000', 'date': '2024-09-01T00:00:00.000Z'})
+    state.end_load()
+    assert state.order_index[101] == 'card2'
@@ -0,0 +1,324 @@
+import heapq
+import re
+import time
+from bisect import bisect_left
+
+# Order numbers are written in card names as "# 1234" or similar
+ORDER_NUM_PATTERN = re.compile(r'#\s*(\d+)', re.IGNORECASE)
+
+# Function to extract the order number from a card name (None if the card has no order number)
+def extract_order_num(card_name):
+    match = ORDER_NUM_PATTERN.search(card_name.strip())
+    if match:
+        return int(match.group(1))
+    return None
+
+# /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxx/
+
+# Trello action types that change which cards and lists exist on the board
+CARD_CREATE_ACTIONS = {'createCard', 'copyCard', 'moveCardToBoard', 'convertToCardFromCheckItem'}
+CARD_REMOVE_ACTIONS = {'deleteCard', 'moveCardFromBoard'}
+LIST_CREATE_ACTIONS = {'createList', 'moveListToBoard'}
+
+# In-memory copy of the board: open lists, open cards and an order number -> card id index
+class BoardState:
+    def __init__(self):
+        self.lists = {}  # list id -> {'id', 'name', 'pos'}
+        self.cards = {}  # card id -> {'id', 'name', 'idList', 'due', 'pos'}
+        self.order_index = {}  # order number -> card id
+        self.loaded_at = None
+        self.live_until = None  # Monotonic time until which a webhook or delta sync is known to keep the state current
+        self.resync_requested = False  # Set when an action cannot be applied incrementally
+        self.sync_cursor = None  # {'id', 'date'} of the newest board action reflected in the state
+        self.reconciling = False  # True from loading a saved snapshot until a sync has brought it up to date
+        self.synced_at = None  # Wall-clock time the state was last brought up to date from Trello (full load or delta sync)
+        self.version = 0  # Bumped on every change, so readers can tell when derived data is out of date
+        self.action_listeners = []  # Callbacks given every board action applied, e.g. to invalidate caches
+        self.loading = False  # True while a full board download is in flight
+        self._actions_during_load = []  # Actions applied meanwhile; the download may predate them
+
+    @property
+    def loaded(self):
+        return self.loaded_at is not None
+
+    # True while recent webhook callbacks or delta syncs are keeping the state current
+    @property
+    def live_updates(self):
+        return self.live_until is not None and time.monotonic() < self.live_until
+
+    # Function to record a verified webhook callback or a successful delta sync; the state counts as live for `seconds`
+    def mark_live(self, seconds):
+        self.live_until = time.monotonic() + seconds
+
+    # Function to record that the state was brought fully up to date without a full load (e.g. a snapshot reconciled by delta sync)
+    def mark_current(self):
+        self.loaded_at = time.monotonic()
+        self.reconciling = False
+
+    # Seconds since the last full load (infinite if never loaded)
+    def age(self):
+        if self.loaded_at is None:
+            return float('inf')
+        return time.monotonic() - self.loaded_at
+
+    # Function to replace the whole state with a board download; `age` is how old the data already is (seconds),
+    # so a saved snapshot is not mistaken for a fresh download
+    def load(self, lists, cards, sync_cursor=None, age=0):
+        self.lists = {list_['id']: _list_entry(list_) for list_ in lists}
+        self.cards = {}
+        for card in cards:
+            if card['idList'] in self.lists:
+                self.cards[card['id']] = _card_entry(card)
+        self._rebuild_order_index()
+        self.loaded_at = time.monotonic() - age
+        self.resync_requested = False
+        self.sync_cursor = sync_cursor
+        self.synced_at = time.time() - age
+        self.reconciling = False
+
+        # Actions that arrived while this download was in flight are replayed unless the download already has them;
+        # Trello action ids start with their timestamp, so they order like the cursor
+        if self.loading:
+            self.loading = False
+            for action in self._actions_during_load:
+                if sync_cursor is None or action.get('id', '') > sync_cursor['id']:
+                    self.apply_action(action)
+            self._actions_during_load = []
+        self.version += 1
+
+    # Function to mark the start and end of a full board download, so actions applied meanwhile are not lost by load()
+    def begin_load(self):
+        self.loading = True
+        self._actions_during_load = []
+
+    def end_load(self):
+        self.loading = False
+        self._actions_during_load = []
+
+    # Lists in board order, in the same shape the Trello lists endpoint returns
+    def ordered_lists(self):
+        return sorted(self.lists.values(), key=lambda list_: list_['pos'])
+
+    def list_name(self, list_id):
+        list_ = self.lists.get(list_id)
+        return list_['name'] if list_ else None
+
+    # Function to look up a card by order number (None if no open card carries that number)
+    def find_order(self, order_num):
+        card_id = self.order_index.get(order_num)
+        if card_id is None:
+            return None
+        return self.cards.get(card_id)
+
+    # Function to add or update a single card, keeping the order index in sync
+    def upsert_card(self, card):
+        card_id = card['id']
+        old_card = self.cards.get(card_id)
+        entry = dict(old_card) if old_card else {'id': card_id, 'name': '', 'idList': None, 'due': None, 'pos': 0}
+        for key in ('name', 'idList', 'due', 'pos'):
+            if key in card:
+                entry[key] = card[key]
+
+        self.cards[card_id] = entry
+        self.version += 1
+        old_num = extract_order_num(old_card['name']) if old_card else None
+        new_num = extract_order_num(entry['name'])
+        if old_num != new_num:
+            self._drop_from_index(old_num, card_id)
+        if new_num is not None:
+            self._index_card(new_num, entry)
+
+    # Function to drop a card (archived, deleted or moved off the board)
+    def remove_card(self, card_id):
+        card = self.cards.pop(card_id, None)
+        if card:
+            self.version += 1
+            self._drop_from_index(extract_order_num(card['name']), card_id)
+
+    def upsert_list(self, list_):
+        entry = self.lists.setdefault(list_['id'], {'id': list_['id'], 'name': '', 'pos': 0})
+        for key in ('name', 'pos'):
+            if key in list_:
+                entry[key] = list_[key]
+        self.version += 1
+
+    # Function to drop a list and every card that was on it
+    def remove_list(self, list_id):
+        if self.lists.pop(list_id, None):
+            self.version += 1
+        for card_id in [card_id for card_id, card in self.cards.items() if card['idList'] == list_id]:
+            self.remove_card(card_id)
+
+    # Function to apply a single Trello board action (from a webhook or the actions feed) to the state
+    def apply_action(self, action):
+        if self.loading:
+            self._actions_during_load.append(action)
+        for listener in self.action_listeners:
+            listener(action)
+
+        action_type = action.get('type')
+        data = action.get('data', {})
+        card = data.get('card')
+        list_ = data.get('list')
+
+        if action_type in CARD_CREATE_ACTIONS and card and list_:
+            self._apply_card(dict(card, idList=list_['id']))
+            return True
+
+        if action_type == 'updateCard' and card:
+            card = dict(card)
+            if 'listAfter' in data:
+                card['idList'] = data['listAfter']['id']
+            elif card['id'] not in self.cards and list_:
+                # Unarchived cards come back as an update carrying only their list
+                card.setdefault('idList', list_['id'])
+            self._apply_card(card)
+            return True
+
+        if action_type in CARD_REMOVE_ACTIONS and card:
+            self.remove_card(card['id'])
+            return True
+
+        if action_type in LIST_CREATE_ACTIONS and list_:
+            if not list_.get('closed'):
+                self.upsert_list(list_)
+            # A list moved in from another board brings cards the action does not describe
+            if action_type == 'moveListToBoard':
+                self.resync_requested = True
+            return True
+
+        if action_type == 'updateList' and list_:
+            if list_.get('closed'):
+                self.remove_list(list_['id'])
+            else:
+                if list_['id'] not in self.lists:
+                    # Unarchived list: its cards have to be fetched again
+                    self.resync_requested = True
+                self.upsert_list(list_)
+            return True
+
+        if action_type == 'moveListFromBoard' and list_:
+            self.remove_list(list_['id'])
+            return True
+
+        return False
+
+    # Function to apply actions from the actions feed (newest first, as Trello returns them) and advance the cursor
+    def apply_actions(self, actions):
+        for action in reversed(actions):
+            self.apply_action(action)
+        if actions:
+            self.sync_cursor = {'id': actions[0]['id'], 'date': actions[0]['date']}
+            self.version += 1
+
+    def _apply_card(self, card):
+        # Archived cards and cards on lists we do not track behave like deleted ones
+        if card.get('closed') or card.get('idList', self.cards.get(card['id'], {}).get('idList')) not in self.lists:
+            self.remove_card(card['id'])
+        else:
+            self.upsert_card(card)
+
+    # When several cards carry the same order number, the first one in board order wins
+    def _sort_key(self, card):
+        list_ = self.lists.get(card['idList'])
+        return (list_['pos'] if list_ else float('inf'), card['pos'])
+
+    def _rebuild_order_index(self):
+        self.order_index = {}
+        for card in sorted(self.cards.values(), key=self._sort_key):
+            order_num = extract_order_num(card['name'])
+            if order_num is not None:
+                self.order_index.setdefault(order_num, card['id'])
+
+    def _index_card(self, order_num, card):
+        current_id = self.order_index.get(order_num)
+        current = self.cards.get(current_id) if current_id else None
+        if current is None or current_id == card['id'] or self._sort_key(card) < self._sort_key(current):
+            self.order_index[order_num] = card['id']
+
+    def _drop_from_index(self, order_num, card_id):
+        if order_num is None or self.order_index.get(order_num) != card_id:
+            return
+        del self.order_index[order_num]
+        # Fall back to another card with the same number, if there is one
+        candidates = [card for card in self.cards.values()
+                      if card['id'] != card_id and extract_order_num(card['name']) == order_num]
+        if candidates:
+            self.order_index[order_num] = min(candidates, key=self._sort_key)['id']
+
+def _list_entry(list_):
+    return {'id': list_['id'], 'name': list_['name'], 'pos': list_.get('pos', 0)}
+
+def _card_entry(card):
+    return {'id': card['id'], 'name': card['name'], 'idList': card['idList'], 'due': card.get('due'), 'pos': card.get('pos', 0)}
+
+# /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxx/
+
+# Discord shows at most 25 autocomplete choices
+ORDER_SUGGESTION_LIMIT = 25
+
+# Words in card titles that are matched for autocomplete
+TITLE_WORD_PATTERN = re.compile(r'\w+')
+
+# Sorted prefix index over order numbers and card title words, rebuilt from the board state only when it changes
+class OrderSearchIndex:
+    def __init__(self, state):
+        self.state = state
+        self._version = None
+        self._numbers = []  # (order number as text, order number), sorted
+        self._words = []  # (lowercase title word, order number), sorted
+        self._latest = []  # Highest order numbers, suggested before anything is typed
+
+    def _refresh(self):
+        if self._version == self.state.version:
+            return
+        numbers = []
+        words = set()
+        for order_num, card_id in self.state.order_index.items():
+            card = self.state.cards.get(card_id)
+            if card is None:
+                continue
+            numbers.append((str(order_num), order_num))
+            words.update((word, order_num) for word in TITLE_WORD_PATTERN.findall(card['name'].lower()))
+        self._numbers = sorted(numbers)
+        self._words = sorted(words)
+        self._latest = heapq.nlargest(ORDER_SUGGESTION_LIMIT, (order_num for _, order_num in numbers))
+        self._version = self.state.version
+
+    @staticmethod
+    def _with_prefix(entries, prefix):
+        for index in range(bisect_left(entries, (prefix,)), len(entries)):
+            key, order_num = entries[index]
+            if not key.startswith(prefix):
+                break
+            yield order_num
+
+    # Function to suggest order numbers for what the user has typed: number prefixes first, then title words
+    def suggest(self, text, limit=ORDER_SUGGESTION_LIMIT):
+        self._refresh()
+        text = text.strip().lstrip('#').strip().lower()
+        if not text:
+            return self._latest[:limit]
+
+        suggestions = []
+        seen = set()
+        words = TITLE_WORD_PATTERN.findall(text)
+        sources = [self._with_prefix(self._numbers, text)] if text.isdigit() else []
+        if words:
+            # The first word is looked up in the index; any further words only filter its matches
+            sources.append(order_num for order_num in self._with_prefix(self._words, words[0])
+                           if all(word in self.state.find_order(order_num)['name'].lower() for word in words[1:]))
+        for source in sources:
+            for order_num in source:
+                if order_num not in seen:
+                    seen.add(order_num)
+                    suggestions.append(order_num)
+                    if len(suggestions) >= limit:
+                        return suggestions
+        return suggestions
+
+# Shared board state used by every Trello command
+board_state = BoardState()
+
+# Order number autocomplete over the shared board state
+order_search = OrderSearchIndex(board_state)
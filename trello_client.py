@@ -0,0 +1,164 @@
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager, nullcontext
+import aiohttp
+
+TRELLO_API_URL = "https://api.trello.com/1"
+
+# Connection pool and request limits for the shared Trello session
+MAX_CONNECTIONS = 10  # Keep-alive connections held open per host (api.trello.com, the Discord CDN)
+MAX_CONCURRENT_REQUESTS = 8  # Requests allowed in flight at once
+KEEPALIVE_SECONDS = 60
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=10)
+
+# Trello allows 100 requests per 10 seconds per token (300 per key); stay a little under it
+RATE_LIMIT_REQUESTS = 90
+RATE_LIMIT_PERIOD = 10
+
+# Retries for 429 responses when Trello does not say how long to wait
+MAX_RATE_LIMIT_RETRIES = 4
+BACKOFF_BASE_SECONDS = 1
+
+# Errors raised by the client that callers should turn into an error message
+TRELLO_REQUEST_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+# Token bucket shared by every Trello request; a 429 pauses the whole bucket
+class TokenBucket:
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.rate = capacity / period  # Tokens added per second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0
+        self._lock = asyncio.Lock()
+
+    # Function to wait until a request may be sent
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    # Function to hold back every request for a while, e.g. after Trello answered 429
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+# Function to work out how long to wait after a 429 (Retry-After if given, else exponential backoff with jitter)
+def rate_limit_delay(response, attempt):
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return BACKOFF_BASE_SECONDS * (2 ** attempt) + random.uniform(0, BACKOFF_BASE_SECONDS)
+
+# Long-lived async Trello client sharing one pooled aiohttp session across every command
+class TrelloClient:
+    def __init__(self, api_key, token):
+        self.api_key = api_key
+        self.token = token
+        self._session = None
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self._bucket = TokenBucket(RATE_LIMIT_REQUESTS, RATE_LIMIT_PERIOD)
+        self._inflight = {}  # (url, params) -> task, for GETs currently being fetched
+
+    # The session is created lazily so it binds to the running event loop
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            # Limited per host, so downloads relayed into Trello uploads can't take the connections the uploads need
+            connector = aiohttp.TCPConnector(limit=0, limit_per_host=MAX_CONNECTIONS, keepalive_timeout=KEEPALIVE_SECONDS, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=REQUEST_TIMEOUT)
+        return self._session
+
+    def _build_request(self, path, params, authorize):
+        url = path if path.startswith("http") else f"{TRELLO_API_URL}{path}"
+        params = dict(params or {})
+        headers = {}
+        if authorize == "query":
+            params.update(key=self.api_key, token=self.token)
+        elif authorize == "header":
+            # Attachment downloads reject key/token query parameters and need the OAuth header
+            headers["Authorization"] = f"OAuth oauth_consumer_key=\"{self.api_key}\", oauth_token=\"{self.token}\""
+        return url, params, headers
+
+    # Function to open a response, waiting on the rate limiter and retrying 429s; the caller must release it
+    async def _open(self, method, url, params, data, headers, rate_limited):
+        # Multipart bodies are consumed by the first attempt and cannot be replayed
+        max_retries = 0 if isinstance(data, aiohttp.FormData) else MAX_RATE_LIMIT_RETRIES
+        attempt = 0
+        while True:
+            if rate_limited:
+                await self._bucket.acquire()
+            response = await self._get_session().request(method, url, params=params, data=data, headers=headers)
+            if response.status != 429 or attempt >= max_retries:
+                return response
+
+            delay = rate_limit_delay(response, attempt)
+            response.release()
+            print(f"Trello rate limit hit, retrying {method} {url} in {delay:.1f}s.")
+            self._bucket.pause(delay)
+            attempt += 1
+
+    async def _send(self, method, url, params, data, headers, rate_limited):
+        async with self._semaphore:
+            response = await self._open(method, url, params, data, headers, rate_limited)
+            async with response:
+                if response.content_type == "application/json":
+                    payload = await response.json()
+                else:
+                    payload = await response.text()
+                return response.status, payload
+
+    # Function to send a request and return (status, payload); payload is parsed JSON when possible
+    async def request(self, method, path, params=None, data=None, authorize="query"):
+        url, params, headers = self._build_request(path, params, authorize)
+        rate_limited = authorize is not None
+
+        # Identical GETs in flight at the same time share one upstream request
+        if method == "GET" and data is None:
+            key = (url, tuple(sorted(params.items())), authorize)
+            task = self._inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._send(method, url, params, data, headers, rate_limited))
+                self._inflight[key] = task
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            return await asyncio.shield(task)
+
+        return await self._send(method, url, params, data, headers, rate_limited)
+
+    async def get(self, path, params=None):
+        return await self.request("GET", path, params=params)
+
+    async def put(self, path, params=None, data=None):
+        return await self.request("PUT", path, params=params, data=data)
+
+    async def post(self, path, params=None, data=None):
+        return await self.request("POST", path, params=params, data=data)
+
+    # Context manager yielding the raw response, for downloads that should not be buffered by the client.
+    # Unauthorized (non-Trello) downloads skip the request limit, so one can be relayed into a Trello upload
+    # without holding a slot the upload is waiting for.
+    @asynccontextmanager
+    async def stream(self, method, path, params=None, authorize="query"):
+        url, params, headers = self._build_request(path, params, authorize)
+        async with self._semaphore if authorize is not None else nullcontext():
+            response = await self._open(method, url, params, None, headers, authorize is not None)
+            async with response:
+                yield response
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
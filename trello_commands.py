@@ -1,11 +1,16 @@
-import requests
+import asyncio
+import re
+import time
 from dotenv import load_dotenv
 import os
-import re
 import pytz
 import aiohttp
-import io
 import discord
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from trello_board import board_state
+from attachment_cache import attachment_cache
+from trello_client import TrelloClient, TRELLO_REQUEST_ERRORS
 
 # Trello API credentials (You can move these to a config file if needed)
 load_dotenv(dotenv_path="./credentials.env")
@@ -13,273 +18,379 @@ TRELLO_API_KEY = os.getenv('TRELLO_API_KEY')
 TRELLO_TOKEN = os.getenv('TRELLO_TOKEN')
 TRELLO_BOARD_ID = os.getenv('TRELLO_BOARD_ID')
 
-# Set Pakistan Standard Time (PST) timezone
-pst = pytz.timezone('Asia/Karachi')
+# Shared async client; every Trello call goes through its pooled session
+trello_client = TrelloClient(TRELLO_API_KEY, TRELLO_TOKEN)
 
-# /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxx/
+# Cached attachment files are dropped when webhooks or the delta sync report them deleted
+board_state.action_listeners.append(attachment_cache.handle_board_action)
 
-# Function to search for an order in Trello
-def search_order_in_trello(order_num, return_details=False):
-    try:
-        # Log the order number for debugging
-        print(f"Searching for order number: {order_num}")
+# Set Pakistan Standard Time (PST) timezone
+pst = pytz.timezone('Asia/Karachi')
 
-        # URL to fetch all lists from the board
-        url = f"https://api.trello.com/1/boards/{TRELLO_BOARD_ID}/lists?key={TRELLO_API_KEY}&token={TRELLO_TOKEN}"
-        response = requests.get(url)
+# Timestamp format Trello uses for action, comment and attachment dates
+TRELLO_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
 
-        if response.status_code != 200:
-            return "Error: Unable to fetch lists from Trello. Please check your API key and token."
+# Attachments uploaded this close to a comment (seconds) are shown with it
+ATTACHMENT_MATCH_WINDOW = 5 * 60
+# Largest attachment downloaded for /order_comments (Discord's upload limit without boosts)
+ATTACHMENT_MAX_BYTES = 10 * 1024 * 1024
+ATTACHMENT_CHUNK_SIZE = 64 * 1024
+# Attachments downloaded at once for one command
+ATTACHMENT_DOWNLOAD_CONCURRENCY = 4
+ATTACHMENT_MAX_FILES = 10
 
-        lists = response.json()
+# Trello's attachment size limit on free workspaces
+UPLOAD_MAX_BYTES = 10 * 1024 * 1024
 
-        # Iterate over each list in the Trello board
-        for list_ in lists:
-            list_id = list_['id']
-            # Fetch cards in each list
-            cards_url = f"https://api.trello.com/1/lists/{list_id}/cards?key={TRELLO_API_KEY}&token={TRELLO_TOKEN}"
-            cards_response = requests.get(cards_url)
+# /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxx/
 
-            if cards_response.status_code != 200:
-                return f"Error: Unable to fetch cards for list {list_['name']}."
+# How long the board index is trusted before a lookup triggers a full reload (seconds)
+BOARD_INDEX_MAX_AGE = 300
+# Same, while webhooks or delta sync keep the index current; only a safety net
+BOARD_INDEX_LIVE_MAX_AGE = 6 * 60 * 60
+# A lookup that misses only reloads the board if the index is at least this old (seconds)
+BOARD_INDEX_MISS_REFRESH = 15
+
+# Function to check whether the board index should be reloaded before it is used; a snapshot still being
+# reconciled in the background is used as it is, so the first lookups after a restart don't wait on a full download
+def board_state_is_stale():
+    if board_state.resync_requested:
+        return True
+    if board_state.reconciling:
+        return False
+    max_age = BOARD_INDEX_LIVE_MAX_AGE if board_state.live_updates else BOARD_INDEX_MAX_AGE
+    return board_state.age() > max_age
+
+# Reload currently running, shared by every caller that needs the board at the same time
+_board_refresh_task = None
+
+# Function to reload the board index; concurrent callers wait on the same reload
+async def refresh_board_state():
+    global _board_refresh_task
+    if _board_refresh_task is None:
+        _board_refresh_task = asyncio.ensure_future(_load_board_state())
+        _board_refresh_task.add_done_callback(_clear_board_refresh_task)
+    return await asyncio.shield(_board_refresh_task)
+
+def _clear_board_refresh_task(_):
+    global _board_refresh_task
+    _board_refresh_task = None
+
+# Function to download the whole board (open lists and their open cards) in a single request
+async def _load_board_state():
+    board_state.begin_load()
+    try:
+        query = {
+            'fields': 'name',
+            'lists': 'open',
+            'list_fields': 'name,pos',
+            'cards': 'open',
+            'card_fields': 'name,idList,due,pos',
+            # The newest action becomes the delta sync cursor for this snapshot
+            'actions': 'all',
+            'actions_limit': 1,
+            'action_fields': 'id,date',
+        }
+        status, board = await trello_client.get(f"/boards/{TRELLO_BOARD_ID}", params=query)
+
+        if status != 200:
+            return "Error: Unable to fetch the board from Trello. Please check your API key and token."
+
+        actions = board.get('actions') or []
+        sync_cursor = {'id': actions[0]['id'], 'date': actions[0]['date']} if actions else None
+        board_state.load(board['lists'], board['cards'], sync_cursor)
+        print(f"Board index loaded: {len(board_state.lists)} lists, {len(board_state.order_index)} orders.")
+        return None
+    except TRELLO_REQUEST_ERRORS as e:
+        return f"Error: {e}"
+    finally:
+        board_state.end_load()
+
+# Board actions the delta sync pulls from the actions feed
+BOARD_SYNC_ACTION_TYPES = ','.join([
+    'createCard', 'copyCard', 'updateCard', 'deleteCard', 'moveCardToBoard', 'moveCardFromBoard',
+    'convertToCardFromCheckItem', 'createList', 'updateList', 'moveListToBoard', 'moveListFromBoard',
+    'deleteAttachmentFromCard',
+])
+# Page size for the actions feed; a full page means we may have missed actions and must resync
+BOARD_SYNC_PAGE_LIMIT = 1000
+# A state not synced for longer than this is reloaded instead of replaying the actions since (seconds)
+BOARD_SYNC_MAX_CURSOR_AGE = 24 * 60 * 60
+
+# Function to bring the board index up to date by replaying actions newer than the sync cursor
+async def sync_board_actions():
+    cursor = board_state.sync_cursor
+    if not board_state.loaded or board_state.resync_requested or cursor is None:
+        return await refresh_board_state()
+
+    # Measured from the last sync rather than the cursor's action, so a quiet board keeps its cursor
+    if time.time() - board_state.synced_at > BOARD_SYNC_MAX_CURSOR_AGE:
+        print("Board sync cursor is too old, running a full resync.")
+        return await refresh_board_state()
 
-            cards = cards_response.json()
+    try:
+        query = {
+            'since': cursor['id'],
+            'filter': BOARD_SYNC_ACTION_TYPES,
+            'limit': BOARD_SYNC_PAGE_LIMIT,
+        }
+        status, actions = await trello_client.get(f"/boards/{TRELLO_BOARD_ID}/actions", params=query)
+
+        # Trello rejects cursors it can no longer resolve; start again from a fresh snapshot
+        if status != 200 or len(actions) >= BOARD_SYNC_PAGE_LIMIT:
+            print("Board actions feed could not be replayed, running a full resync.")
+            return await refresh_board_state()
+
+        board_state.apply_actions(actions)
+        board_state.synced_at = time.time()
+        if actions:
+            print(f"Board sync applied {len(actions)} actions.")
+        return None
+    except TRELLO_REQUEST_ERRORS as e:
+        return f"Error: {e}"
 
-            # Iterate over the cards and extract the order number from each card's name
-            for card in cards:
-                card_name = card['name'].strip()
-                print(f"Checking card: {card_name} in list: {list_['name']}")
+# Function to resolve an order number to its card through the board index
+async def find_order_card(order_num):
+    error = None
+    if board_state_is_stale():
+        error = await refresh_board_state()
+        if error and not board_state.loaded:
+            return None, error
 
-                # Use regex to find the exact order number pattern
-                # This looks for the pattern "# 1234" or similar
-                card_num_match = re.search(r'#\s*(\d+)', card_name, re.IGNORECASE)
+    card = board_state.find_order(order_num)
 
-                if card_num_match:
-                    card_num = int(card_num_match.group(1))  # Extract the numeric order number
+    # The order may have been created after the last load (live updates would already have it)
+    if card is None and not error and not board_state.live_updates and board_state.age() > BOARD_INDEX_MISS_REFRESH:
+        error = await refresh_board_state()
+        if not error:
+            card = board_state.find_order(order_num)
 
-                    # Compare order_num (int) with extracted card_num (int)
-                    if order_num == card_num:
-                        if return_details:
-                            return f"**{card['name']}** found in list **{list_['name']}**."
-                        return card
+    if card is None:
+        return None, error
+    return card, None
 
+# Function to search for an order in Trello
+async def search_order_in_trello(order_num, return_details=False):
+    # Log the order number for debugging
+    print(f"Searching for order number: {order_num}")
+
+    card, error = await find_order_card(order_num)
+    if error:
+        return error
+    if card is None:
         return None  # If no match is found
-    except requests.exceptions.RequestException as e:
-        return f"Error: {e}"
+
+    if return_details:
+        return f"**{card['name']}** found in list **{board_state.list_name(card['idList'])}**."
+    return card
     
 # /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxx/
 
-# Function to move the order to another list
-def move_order_in_trello(order_num, target_list_id, target_list_name):
-    try:
-        # Fetch the lists from the Trello board
-        lists_url = f"https://api.trello.com/1/boards/{TRELLO_BOARD_ID}/lists?key={TRELLO_API_KEY}&token={TRELLO_TOKEN}"
-        lists_response = requests.get(lists_url)
-        if lists_response.status_code != 200:
-            return "Error: Unable to fetch lists from Trello."
-
-        lists = lists_response.json()
-
-        card_id = None
-        card_name = None
-        current_list_name = None
-
-        # Search for the card in the lists
-        for list_ in lists:
-            list_id = list_['id']
-            cards_url = f"https://api.trello.com/1/lists/{list_id}/cards?key={TRELLO_API_KEY}&token={TRELLO_TOKEN}"
-            cards_response = requests.get(cards_url)
-
-            if cards_response.status_code != 200:
-                return f"Error: Unable to fetch cards for list {list_['name']}."
-
-            cards = cards_response.json()
-
-            for card in cards:
-                card_name = card['name'].strip()
-                card_num_match = re.search(r'#\s*(\d+)', card_name, re.IGNORECASE)
-                if card_num_match:
-                    card_num = int(card_num_match.group(1))
-
-                    if order_num == card_num:
-                        card_id = card['id']
-                        current_list_name = list_['name']
-                        break
-            if card_id:
-                break
-
-        if not card_id:
-            return f"Order {order_num} not found."
+# How long a /order_move selection stays usable; matches the select menu's timeout (seconds)
+ORDER_MOVE_TIMEOUT = 180
+
+# State of one /order_move interaction: the card resolved when the command ran and the lists it can go to,
+# so picking a list needs nothing but the move itself
+class OrderMove:
+    def __init__(self, order_num, card, lists):
+        self.order_num = order_num
+        self.card_id = card['id']
+        self.card_name = card['name']
+        self.current_list_id = card['idList']
+        self.current_list_name = board_state.list_name(card['idList'])
+        self.target_lists = [list_ for list_ in lists if list_['id'] != card['idList']]
+        self.expires_at = time.monotonic() + ORDER_MOVE_TIMEOUT
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    # Function to restart the expiry, matching the menu's timeout, which restarts on every interaction
+    def touch(self):
+        self.expires_at = time.monotonic() + ORDER_MOVE_TIMEOUT
+
+    def target_list_name(self, list_id):
+        return next((list_['name'] for list_ in self.target_lists if list_['id'] == list_id), None)
+
+# Function to resolve the card and list catalog for /order_move; returns (OrderMove, error)
+async def start_order_move(order_num):
+    lists, error = await fetch_trello_lists()
+    if error:
+        return None, error
+
+    card, error = await find_order_card(order_num)
+    if error:
+        return None, error
+    if card is None:
+        return None, f"Order {order_num} not found."
+
+    return OrderMove(order_num, card, lists), None
+
+# Function to move the order to the chosen list with a single request, using the card resolved by start_order_move
+async def move_order_in_trello(move, target_list_id):
+    if move.expired:
+        return "This selection has expired. Please run /order_move again."
+
+    target_list_name = move.target_list_name(target_list_id)
+    if target_list_name is None:
+        return "Error: Could not determine the target list name."
 
+    try:
         # Move the card to the new list
-        move_url = f"https://api.trello.com/1/cards/{card_id}?idList={target_list_id}&key={TRELLO_API_KEY}&token={TRELLO_TOKEN}"
-        move_response = requests.put(move_url)
+        status, _ = await trello_client.put(f"/cards/{move.card_id}", params={'idList': target_list_id})
 
-        if move_response.status_code == 200:
-            return f"**{card_name}** moved from **{current_list_name}** to **{target_list_name}**."
+        if status == 200:
+            board_state.upsert_card({'id': move.card_id, 'idList': target_list_id})
+            return f"**{move.card_name}** moved from **{move.current_list_name}** to **{target_list_name}**."
         else:
-            return f"Error: Unable to move order {order_num}."
-    except requests.exceptions.RequestException as e:
+            return f"Error: Unable to move order {move.order_num}."
+    except TRELLO_REQUEST_ERRORS as e:
         return f"Error: {e}"
-    
-# Function to fetch Trello lists and cache them
-def fetch_trello_lists():
-    try:
-        # Fetch all lists from Trello
-        lists_url = f"https://api.trello.com/1/boards/{TRELLO_BOARD_ID}/lists?key={TRELLO_API_KEY}&token={TRELLO_TOKEN}"
-        lists_response = requests.get(lists_url)
 
-        if lists_response.status_code != 200:
+# Function to fetch Trello lists from the board index
+async def fetch_trello_lists():
+    if board_state_is_stale():
+        error = await refresh_board_state()
+        if error and not board_state.loaded:
             return None, "Error: Unable to fetch lists from Trello."
 
-        # Cache the lists
-        cached_lists = lists_response.json()
-
-        return cached_lists, None
-    except requests.exceptions.RequestException as e:
-        return None, f"Error: {e}"
-
-# Function to get the current list of the order, using cached lists
-def get_current_list_name(order_num, cached_lists):
-    try:
-        card_id = None
-        card_name = None
-        current_list_name = None
-
-        # Search for the card in the cached lists
-        for list_ in cached_lists:
-            list_id = list_['id']
-            cards_url = f"https://api.trello.com/1/lists/{list_id}/cards?key={TRELLO_API_KEY}&token={TRELLO_TOKEN}"
-            cards_response = requests.get(cards_url)
-
-            if cards_response.status_code != 200:
-                return None, f"Error: Unable to fetch cards for list {list_['name']}."
-
-            cards = cards_response.json()
-
-            for card in cards:
-                card_name = card['name'].strip()
-                card_num_match = re.search(r'#\s*(\d+)', card_name, re.IGNORECASE)
-                if card_num_match:
-                    card_num = int(card_num_match.group(1))
-                    if order_num == card_num:
-                        card_id = card['id']
-                        current_list_name = list_['name']
-                        break
-            if card_id:
-                break
-
-        if not card_id:
-            return None, f"Order {order_num} not found."
-
-        return current_list_name, None
-
-    except requests.exceptions.RequestException as e:
-        return None, f"Error: {e}"
-
-# Function to get available lists excluding the current one, using cached lists
-def get_available_trello_lists(current_list_name, cached_lists):
-    try:
-        # Exclude the current list
-        available_lists = [list_ for list_ in cached_lists if list_['name'] != current_list_name]
+    return board_state.ordered_lists(), None
 
-        return available_lists, None
-    except Exception as e:
-        return None, f"Error: {str(e)}"
-    
 # /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxx/
 
 # Function to fetch the latest comments from a Trello card and download attachments
-def fetch_latest_comments(order_num):
+async def fetch_latest_comments(order_num):
     try:
-        # Search for the card by order number
-        card = search_order_in_trello(order_num)
+        # Resolve the card through the board index
+        card, error = await find_order_card(order_num)
+        if error:
+            return error, None
 
         if not card:
             return f"Order {order_num} not found.", None
 
         card_id = card['id']
 
-        # URL to fetch actions (comments) for the card
-        url = f"https://api.trello.com/1/cards/{card_id}/actions?filter=commentCard&key={TRELLO_API_KEY}&token={TRELLO_TOKEN}"
-        response = requests.get(url)
+        # Comments and the card's attachments are fetched together, once per command
+        (status, comments), (attachment_status, attachment_data) = await asyncio.gather(
+            trello_client.get(f"/cards/{card_id}/actions", params={'filter': 'commentCard'}),
+            trello_client.get(f"/cards/{card_id}/attachments", params={'fields': 'id,name,date,bytes,isUpload'}))
 
-        if response.status_code != 200:
+        if status != 200:
             return "Error: Unable to fetch comments for this card.", None
 
-        comments = response.json()
-
         if len(comments) == 0:
             return "No comments available for this card.", None
 
         # Extract the latest 3 comments
         latest_comments = comments[:3]
-        comments_text = ""
-        files = []
-
-        for idx, comment in enumerate(latest_comments):
-            comment_text = comment['data']['text']
-            comments_text += f"{idx + 1}. {comment_text}\n"
-
-            # Check if the comment has attachments
-            comment_id = comment['id']
-
-            # Fetch the attachments of the card
-            attachment_url = f"https://api.trello.com/1/cards/{card_id}/attachments?key={TRELLO_API_KEY}&token={TRELLO_TOKEN}"
-            attachment_response = requests.get(attachment_url)
+        attachment_index = index_attachments(attachment_data if attachment_status == 200 else [])
+        if attachment_status == 200:
+            # Attachments no longer on the card are dropped from the disk cache
+            attachment_cache.invalidate_card(card_id, [attachment['id'] for attachment in attachment_data])
+        matched = [attachments_near(attachment_index, trello_timestamp(comment['date'])) for comment in latest_comments]
+
+        # An attachment near several comments is still downloaded once; downloads run concurrently
+        to_download = list({attachment['id']: attachment for attachments in matched for attachment in attachments}.values())
+        semaphore = asyncio.Semaphore(ATTACHMENT_DOWNLOAD_CONCURRENCY)
+        results = await asyncio.gather(*(download_attachment(card_id, attachment, semaphore) for attachment in to_download))
+        downloads = {attachment['id']: result for attachment, result in zip(to_download, results)}
 
-            if attachment_response.status_code == 200:
-                attachment_data = attachment_response.json()
-
-                for attachment in attachment_data:
-                    # Check if the attachment's date is near the comment's date (to match attachments to comments)
-                    attachment_created = attachment['date']
-                    comment_created = comment['date']
-
-                    if is_attachment_near_comment_time(attachment_created, comment_created):
-                        # Add the attachment name to the comment text
-                        comments_text += f"    - Attachment: {attachment['name']}\n"
-
-                        # Download the attachment
-                        download_url = f"https://api.trello.com/1/cards/{card_id}/attachments/{attachment['id']}/download/{attachment['name']}"
-                        download_response = requests.get(download_url, headers={
-                            "Authorization": f"OAuth oauth_consumer_key=\"{TRELLO_API_KEY}\", oauth_token=\"{TRELLO_TOKEN}\""
-                        })
-
-                        if download_response.status_code == 200:
-                            # Create a Discord File object
-                            discord_file = discord.File(io.BytesIO(download_response.content), filename=attachment['name'])
-                            files.append(discord_file)
-                        else:
-                            comments_text += f"    - Failed to download attachment: {attachment['name']}\n"
-
-        return comments_text, files
-
-    except requests.exceptions.RequestException as e:
+        comments_text = ""
+        for idx, (comment, attachments) in enumerate(zip(latest_comments, matched)):
+            comments_text += f"{idx + 1}. {comment['data']['text']}\n"
+            for attachment in attachments:
+                # Add the attachment name to the comment text
+                comments_text += f"    - Attachment: {attachment['name']}\n"
+                discord_file, download_error = downloads[attachment['id']]
+                if download_error:
+                    comments_text += f"    - {download_error}\n"
+
+        # Discord takes at most 10 files per message
+        files = [discord_file for discord_file, _ in results if discord_file is not None]
+        for discord_file in files[ATTACHMENT_MAX_FILES:]:
+            comments_text += f"    - Not sent (message file limit): {discord_file.filename}\n"
+            discord_file.close()
+        return comments_text, files[:ATTACHMENT_MAX_FILES]
+
+    except TRELLO_REQUEST_ERRORS as e:
         return f"Error: {e}", None
 
-# Helper function to compare timestamps of comment and attachment
-def is_attachment_near_comment_time(attachment_time, comment_time, time_threshold_minutes=5):
-    from datetime import datetime, timedelta
-
-    # Convert the strings into datetime objects
-    fmt = "%Y-%m-%dT%H:%M:%S.%fZ"
-    attachment_time_dt = datetime.strptime(attachment_time, fmt)
-    comment_time_dt = datetime.strptime(comment_time, fmt)
-
-    # Calculate the time difference
-    time_difference = abs((attachment_time_dt - comment_time_dt).total_seconds() / 60.0)
-
-    # Return True if the attachment was created within the threshold window
-    return time_difference <= time_threshold_minutes
+# Function to convert a Trello timestamp to epoch seconds
+def trello_timestamp(value):
+    return datetime.strptime(value, TRELLO_DATE_FORMAT).replace(tzinfo=pytz.utc).timestamp()
+
+# Function to sort a card's attachments by upload time so comments can find theirs with a binary search
+def index_attachments(attachments):
+    attachments = sorted(attachments, key=lambda attachment: trello_timestamp(attachment['date']))
+    return [trello_timestamp(attachment['date']) for attachment in attachments], attachments
+
+# Function to get the attachments uploaded within the match window of a comment
+def attachments_near(attachment_index, timestamp, window=ATTACHMENT_MATCH_WINDOW):
+    times, attachments = attachment_index
+    return attachments[bisect_left(times, timestamp - window):bisect_right(times, timestamp + window)]
+
+# Function to get one attachment as a Discord file, from the disk cache when it was downloaded before;
+# files are sent from disk rather than memory. Returns (discord_file, None) or (None, reason it was skipped).
+async def download_attachment(card_id, attachment, semaphore):
+    name = attachment['name']
+    if attachment.get('isUpload') is False:
+        return None, f"Link attachment, not downloaded: {name}"
+    if (attachment.get('bytes') or 0) > ATTACHMENT_MAX_BYTES:
+        return None, f"Attachment too large to send: {name}"
+
+    cached_path = attachment_cache.get(attachment['id'])
+    if cached_path is not None:
+        return discord.File(cached_path, filename=name), None
+
+    download_path = f"/cards/{card_id}/attachments/{attachment['id']}/download/{name}"
+    temp_file, hasher = attachment_cache.begin_download()
+    try:
+        async with semaphore:
+            async with trello_client.stream("GET", download_path, authorize="header") as download_response:
+                if download_response.status != 200:
+                    attachment_cache.abort_download(temp_file)
+                    return None, f"Failed to download attachment: {name}"
+
+                size = 0
+                async for chunk in download_response.content.iter_chunked(ATTACHMENT_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > ATTACHMENT_MAX_BYTES:
+                        attachment_cache.abort_download(temp_file)
+                        return None, f"Attachment too large to send: {name}"
+                    temp_file.write(chunk)
+                    hasher.update(chunk)
+    except TRELLO_REQUEST_ERRORS:
+        attachment_cache.abort_download(temp_file)
+        return None, f"Failed to download attachment: {name}"
+
+    return discord.File(attachment_cache.finish_download(attachment['id'], card_id, temp_file, hasher), filename=name), None
 
 # /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxx/
 
+# Relays a download into an upload chunk by chunk, enforcing the size limit as it goes
+class UploadStream:
+    def __init__(self, response, limit=UPLOAD_MAX_BYTES):
+        self.response = response
+        self.limit = limit
+        self.too_large = False  # Set when the body outgrew the limit and the upload was aborted
+
+    async def chunks(self):
+        size = 0
+        async for chunk in self.response.content.iter_chunked(ATTACHMENT_CHUNK_SIZE):
+            size += len(chunk)
+            if size > self.limit:
+                self.too_large = True
+                raise ValueError("Upload exceeds the size limit.")
+            yield chunk
+
 # Function to add a comment with an optional attachment to a Trello card
 async def add_comment_with_attachment_in_trello(order_num, comment_text=None, attachment=None):
     try:
-        # Search for the card by order number
-        card = search_order_in_trello(order_num)
+        # Resolve the card through the board index
+        card, error = await find_order_card(order_num)
+        if error:
+            return error
 
         if not card:
             return f"Order {order_num} not found."
@@ -294,31 +405,33 @@ async def add_comment_with_attachment_in_trello(order_num, comment_text=None, at
 
         # Handle the file upload if an attachment is provided
         if attachment:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(attachment.url) as attachment_response:
-                    if attachment_response.status != 200:
-                        return f"Error: Failed to download attachment from Discord. Status code: {attachment_response.status}"
-
-                    # Trello free limit is 10 MB
-                    file_size_limit = 10 * 1024 * 1024  # 10 MB in bytes
-                    if attachment.size > file_size_limit:
+            # Trello free limit is 10 MB; Discord reports the size up front, so oversized files are never downloaded
+            if attachment.size > UPLOAD_MAX_BYTES:
+                return f"Error: Attachment exceeds the 10 MB size limit allowed by Trello."
+
+            async with trello_client.stream("GET", attachment.url, authorize=None) as attachment_response:
+                if attachment_response.status != 200:
+                    return f"Error: Failed to download attachment from Discord. Status code: {attachment_response.status}"
+
+                # The file goes straight from the Discord CDN response into the multipart upload, chunk by chunk
+                upload = UploadStream(attachment_response)
+                form = aiohttp.FormData()
+                form.add_field('file', upload.chunks(), filename=attachment.filename,
+                               content_type=attachment.content_type)  # Specify the MIME type
+
+                # Upload the file as an attachment to the card; aiohttp reports an aborted body as a connection error
+                try:
+                    status, response = await trello_client.post(f"/cards/{card_id}/attachments", data=form)
+                except TRELLO_REQUEST_ERRORS:
+                    if upload.too_large:
                         return f"Error: Attachment exceeds the 10 MB size limit allowed by Trello."
+                    raise
 
-                    file_data = await attachment_response.read()
-
-                    files = {
-                        'file': (attachment.filename, file_data, attachment.content_type)  # Specify the MIME type
-                    }
-
-                    # Upload the file as an attachment to the card
-                    url = f"https://api.trello.com/1/cards/{card_id}/attachments?key={TRELLO_API_KEY}&token={TRELLO_TOKEN}"
-                    response = requests.post(url, files=files)
+            if status == 200:
+                attachment_info = response  # Get the attachment info from Trello
 
-                    if response.status_code == 200:
-                        attachment_info = response.json()  # Get the attachment info from Trello
-
-                    else:
-                        return f"Error: Failed to upload attachment to Trello. Status code: {response.status_code}, Response: {response.text}"
+            else:
+                return f"Error: Failed to upload attachment to Trello. Status code: {status}, Response: {response}"
 
         # Prepare the comment
         if comment_text:
@@ -333,11 +446,10 @@ async def add_comment_with_attachment_in_trello(order_num, comment_text=None, at
 
         # Add the comment to the card
         if comment_to_add:
-            url = f"https://api.trello.com/1/cards/{card_id}/actions/comments?key={TRELLO_API_KEY}&token={TRELLO_TOKEN}"
-            response = requests.post(url, data={'text': comment_to_add})
+            status, response = await trello_client.post(f"/cards/{card_id}/actions/comments", data={'text': comment_to_add})
 
-            if response.status_code != 200:
-                return f"Error: Unable to add comment. Status code: {response.status_code}, Response: {response.text}"
+            if status != 200:
+                return f"Error: Unable to add comment. Status code: {status}, Response: {response}"
 
         return f"Comment and/or attachment added to order # **{order_num}**."
 
@@ -347,32 +459,35 @@ async def add_comment_with_attachment_in_trello(order_num, comment_text=None, at
 # /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxx/
 
 # Function to set the due date for a Trello card
-def set_order_due_date_in_trello(order_num, due_datetime):
+async def set_order_due_date_in_trello(order_num, due_datetime):
     try:
         # Convert the provided datetime to UTC from PST
         due_datetime_pst = pst.localize(due_datetime)  # Localize to PST
         due_datetime_utc = due_datetime_pst.astimezone(pytz.utc)  # Convert to UTC
         
-        # Search for the card by order number
-        card = search_order_in_trello(order_num)
+        # Resolve the card through the board index
+        card, error = await find_order_card(order_num)
+        if error:
+            print(error)
+            return False
 
         if card:
             card_id = card['id']
 
             # Trello API endpoint for updating a card's due date
-            url = f"https://api.trello.com/1/cards/{card_id}?key={TRELLO_API_KEY}&token={TRELLO_TOKEN}"
             query = {
                 'due': due_datetime_utc.isoformat(),  # ISO format in UTC
             }
 
             # Send request to Trello API
-            response = requests.put(url, params=query)
+            status, _ = await trello_client.put(f"/cards/{card_id}", params=query)
 
-            if response.status_code == 200:
+            if status == 200:
+                board_state.upsert_card({'id': card_id, 'due': query['due']})
                 print(f"Due date for order {order_num} set to {due_datetime_utc}. (PST: {due_datetime})")
                 return True
             else:
-                print(f"Failed to set due date for order {order_num}. Status code: {response.status_code}")
+                print(f"Failed to set due date for order {order_num}. Status code: {status}")
                 return False
         else:
             print(f"Order {order_num} not found in Trello.")
@@ -382,4 +497,150 @@ def set_order_due_date_in_trello(order_num, due_datetime):
         print(f"Error setting due date: {e}")
         return False
 
-# /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxx/
\ No newline at end of file
+# /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxx/
+# Most orders one bulk command may touch
+BULK_ORDER_LIMIT = 100
+
+# Pattern for one entry of an order selection: a number or an inclusive range like 1200-1210
+ORDER_SELECTION_PATTERN = re.compile(r'#?\s*(\d+)(?:\s*-\s*#?\s*(\d+))?')
+
+# Function to parse an order selection like "1201, 1205-1210 #1300" into order numbers; returns (order_nums, error)
+def parse_order_selection(text):
+    order_nums = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        if text[position] in ", \t":
+            position += 1
+            continue
+        match = ORDER_SELECTION_PATTERN.match(text, position)
+        if not match:
+            return None, f"Could not read the order list near '{text[position:position + 10]}'."
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else start
+        if end < start:
+            return None, f"Invalid range {start}-{end}."
+        if len(order_nums) + end - start + 1 > BULK_ORDER_LIMIT:
+            return None, f"Too many orders; at most {BULK_ORDER_LIMIT} can be changed at once."
+        order_nums.extend(range(start, end + 1))
+        position = match.end()
+    return list(dict.fromkeys(order_nums)), None
+
+# Function to resolve many order numbers in one pass over the board index; returns ({order_num: card}, missing, error)
+async def resolve_order_cards(order_nums):
+    error = None
+    if board_state_is_stale():
+        error = await refresh_board_state()
+        if error and not board_state.loaded:
+            return {}, list(order_nums), error
+
+    cards = {order_num: board_state.find_order(order_num) for order_num in order_nums}
+    missing = [order_num for order_num, card in cards.items() if card is None]
+
+    # One reload covers every miss, instead of one per order
+    if missing and not error and not board_state.live_updates and board_state.age() > BOARD_INDEX_MISS_REFRESH:
+        if not await refresh_board_state():
+            cards.update((order_num, board_state.find_order(order_num)) for order_num in missing)
+            missing = [order_num for order_num, card in cards.items() if card is None]
+
+    return {order_num: card for order_num, card in cards.items() if card is not None}, missing, None
+
+# Function to find a list on the board by name (case-insensitive)
+def find_list_by_name(list_name):
+    wanted = list_name.strip().lower()
+    return next((list_ for list_ in board_state.ordered_lists() if list_['name'].lower() == wanted), None)
+
+# Function to select every order in a list; returns ({order_num: card}, error)
+async def orders_in_list(list_name):
+    if board_state_is_stale():
+        error = await refresh_board_state()
+        if error and not board_state.loaded:
+            return {}, error
+
+    list_ = find_list_by_name(list_name)
+    if list_ is None:
+        return {}, f"List '{list_name}' not found."
+
+    cards = {}
+    for order_num, card_id in board_state.order_index.items():
+        card = board_state.cards.get(card_id)
+        if card is not None and card['idList'] == list_['id']:
+            cards[order_num] = card
+    if len(cards) > BULK_ORDER_LIMIT:
+        return {}, f"List '{list_['name']}' has {len(cards)} orders; at most {BULK_ORDER_LIMIT} can be changed at once."
+    return cards, None
+
+# Function to pick the orders for a bulk command from an order selection or a list name; returns (cards, missing, error)
+async def select_bulk_orders(orders=None, from_list=None):
+    if bool(orders) == bool(from_list):
+        return {}, [], "Give either a list of order numbers or a list to take every order from."
+    if from_list:
+        cards, error = await orders_in_list(from_list)
+        return cards, [], error
+
+    order_nums, error = parse_order_selection(orders)
+    if error:
+        return {}, [], error
+    if not order_nums:
+        return {}, [], "No order numbers given."
+    return await resolve_order_cards(order_nums)
+
+# Function to send one card update per order concurrently; the shared client keeps them inside Trello's rate limit.
+# Returns {order_num: error message or None}
+async def update_order_cards(cards, params):
+    async def update(card):
+        try:
+            status, _ = await trello_client.put(f"/cards/{card['id']}", params=params)
+        except TRELLO_REQUEST_ERRORS as e:
+            return f"Error: {e}"
+        if status != 200:
+            return f"Trello returned status {status}"
+        board_state.upsert_card(dict(params, id=card['id']))
+        return None
+
+    order_nums = list(cards)
+    results = await asyncio.gather(*(update(cards[order_num]) for order_num in order_nums))
+    return dict(zip(order_nums, results))
+
+# Function to move many orders to one list; returns a summary with a line per order
+async def bulk_move_orders_in_trello(cards, missing, target_list_name):
+    target_list = find_list_by_name(target_list_name)
+    if target_list is None:
+        return f"List '{target_list_name}' not found."
+
+    # Orders already in the target list need no request
+    to_move = {order_num: card for order_num, card in cards.items() if card['idList'] != target_list['id']}
+    from_lists = {order_num: board_state.list_name(card['idList']) for order_num, card in to_move.items()}
+    results = await update_order_cards(to_move, {'idList': target_list['id']})
+
+    lines = []
+    for order_num in sorted(set(cards) | set(missing)):
+        card = cards.get(order_num)
+        if card is None:
+            lines.append(f"Failed: # {order_num} not found.")
+        elif order_num not in to_move:
+            lines.append(f"Skipped: **{card['name']}** is already in **{target_list['name']}**.")
+        elif results[order_num]:
+            lines.append(f"Failed: **{card['name']}**: {results[order_num]}")
+        else:
+            lines.append(f"Moved: **{card['name']}** from **{from_lists[order_num]}**.")
+    moved = sum(1 for order_num in to_move if not results[order_num])
+    return f"**Moved {moved} of {len(cards) + len(missing)} orders to {target_list['name']}.**\n" + "\n".join(lines)
+
+# Function to set the same due date on many orders; returns a summary with a line per order
+async def bulk_set_order_due_date_in_trello(cards, missing, due_datetime):
+    due_datetime_utc = pst.localize(due_datetime).astimezone(pytz.utc)
+    results = await update_order_cards(cards, {'due': due_datetime_utc.isoformat()})
+
+    lines = []
+    for order_num in sorted(set(cards) | set(missing)):
+        card = cards.get(order_num)
+        if card is None:
+            lines.append(f"Failed: # {order_num} not found.")
+        elif results[order_num]:
+            lines.append(f"Failed: **{card['name']}**: {results[order_num]}")
+        else:
+            lines.append(f"Updated: **{card['name']}**.")
+    updated = sum(1 for error in results.values() if not error)
+    return (f"**Set the due date of {updated} of {len(cards) + len(missing)} orders to "
+            f"{due_datetime.strftime('%d %b %Y %H:%M')} PST.**\n" + "\n".join(lines))
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+
+# Local copy of the board, kept next to the reminders database
+BOARD_DB_PATH = "./database/trello_board.db"
+
+# Function to create the snapshot tables if they don't exist
+def initialize_board_snapshot(db_path=BOARD_DB_PATH):
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS board_lists (
+                id TEXT PRIMARY KEY,
+                name TEXT,
+                pos REAL
+            );
+            CREATE TABLE IF NOT EXISTS board_cards (
+                id TEXT PRIMARY KEY,
+                name TEXT,
+                id_list TEXT,
+                due TEXT,
+                pos REAL
+            );
+            CREATE TABLE IF NOT EXISTS board_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        ''')
+        conn.commit()
+    finally:
+        conn.close()
+
+# Function to load the saved snapshot into the board state; returns False when there is nothing to load
+def load_board_snapshot(state, db_path=BOARD_DB_PATH):
+    if not os.path.exists(db_path):
+        return False
+
+    initialize_board_snapshot(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        lists = [{'id': row[0], 'name': row[1], 'pos': row[2]}
+                 for row in conn.execute('SELECT id, name, pos FROM board_lists')]
+        cards = [{'id': row[0], 'name': row[1], 'idList': row[2], 'due': row[3], 'pos': row[4]}
+                 for row in conn.execute('SELECT id, name, id_list, due, pos FROM board_cards')]
+        meta = dict(conn.execute('SELECT key, value FROM board_meta'))
+    finally:
+        conn.close()
+
+    if not lists:
+        return False
+
+    sync_cursor = json.loads(meta['sync_cursor']) if meta.get('sync_cursor') else None
+    # The snapshot is as current as its last sync, which can be older than its save
+    saved_age = max(0, time.time() - float(meta.get('saved_at', 0)))
+    synced_age = max(0, time.time() - float(meta['synced_at'])) if meta.get('synced_at') else saved_age
+    state.load(lists, cards, sync_cursor, age=synced_age)
+    state.reconciling = True  # Until the background reconcile catches it up, lookups are answered from the snapshot
+    print(f"Board snapshot loaded: {len(state.lists)} lists, {len(state.order_index)} orders "
+          f"(saved {int(saved_age)}s ago, synced {int(synced_age)}s ago).")
+    return True
+
+# Function to copy the board state into plain rows (runs on the event loop so the state can't change mid-copy)
+def capture_board_snapshot(state):
+    lists = [(list_['id'], list_['name'], list_['pos']) for list_ in state.lists.values()]
+    cards = [(card['id'], card['name'], card['idList'], card['due'], card['pos']) for card in state.cards.values()]
+    meta = [
+        ('sync_cursor', json.dumps(state.sync_cursor) if state.sync_cursor else ''),
+        ('saved_at', str(time.time())),
+        ('synced_at', str(state.synced_at) if state.synced_at is not None else ''),
+    ]
+    return lists, cards, meta
+
+# Function to replace the saved snapshot with captured rows in a single transaction
+def write_board_snapshot(snapshot, db_path=BOARD_DB_PATH):
+    lists, cards, meta = snapshot
+    initialize_board_snapshot(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.execute('DELETE FROM board_lists')
+            conn.execute('DELETE FROM board_cards')
+            conn.executemany('INSERT INTO board_lists (id, name, pos) VALUES (?, ?, ?)', lists)
+            conn.executemany('INSERT INTO board_cards (id, name, id_list, due, pos) VALUES (?, ?, ?, ?, ?)', cards)
+            conn.executemany('INSERT OR REPLACE INTO board_meta (key, value) VALUES (?, ?)', meta)
+    finally:
+        conn.close()
+
+# Function to save the board state without blocking the event loop
+async def save_board_snapshot(state, db_path=BOARD_DB_PATH):
+    if not state.loaded:
+        return
+    snapshot = capture_board_snapshot(state)
+    await asyncio.to_thread(write_board_snapshot, snapshot, db_path)
@@ -0,0 +1,108 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+from aiohttp import web
+from trello_board import board_state
+from trello_client import TRELLO_REQUEST_ERRORS
+from trello_commands import trello_client, TRELLO_BOARD_ID, TRELLO_TOKEN
+
+# Webhook settings (leave TRELLO_WEBHOOK_PORT unset to disable the receiver)
+TRELLO_WEBHOOK_HOST = os.getenv('TRELLO_WEBHOOK_HOST', '0.0.0.0')
+TRELLO_WEBHOOK_PORT = os.getenv('TRELLO_WEBHOOK_PORT')
+TRELLO_WEBHOOK_PATH = os.getenv('TRELLO_WEBHOOK_PATH', '/trello/webhook')
+# Public URL Trello should call; when set the webhook is registered on startup
+TRELLO_WEBHOOK_CALLBACK_URL = os.getenv('TRELLO_WEBHOOK_CALLBACK_URL')
+# Trello application secret, used to verify the X-Trello-Webhook signature; the receiver does not start without it
+TRELLO_API_SECRET = os.getenv('TRELLO_API_SECRET')
+# Seconds the board index counts as live after a verified callback; a quiet or disabled webhook falls back to periodic reloads
+TRELLO_WEBHOOK_LIVE_WINDOW = 30 * 60
+
+# /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxx/
+
+# Function to check the signature Trello puts on every callback (base64 HMAC-SHA1 of body + callback URL)
+def is_valid_signature(body, signature, secret=TRELLO_API_SECRET, callback_url=TRELLO_WEBHOOK_CALLBACK_URL):
+    if not secret or not callback_url or not signature:
+        return False
+    digest = hmac.new(secret.encode(), body + callback_url.encode(), hashlib.sha1).digest()
+    return hmac.compare_digest(base64.b64encode(digest).decode(), signature)
+
+# Function to check that a callback is about the configured board
+def is_configured_board(model, board_id=TRELLO_BOARD_ID):
+    return board_id in (model.get('id'), model.get('shortLink'))
+
+# Trello sends HEAD (and some proxies GET) when the webhook is created to check the URL is reachable
+async def handle_webhook_probe(request):
+    return web.Response(status=200)
+
+# Function to receive a webhook callback and apply its action to the board state
+async def handle_webhook_event(request):
+    body = await request.read()
+
+    if not is_valid_signature(body, request.headers.get('X-Trello-Webhook'), TRELLO_API_SECRET, TRELLO_WEBHOOK_CALLBACK_URL):
+        print("Rejected Trello webhook callback with an invalid signature.")
+        return web.Response(status=401)
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return web.Response(status=400)
+
+    if not is_configured_board(payload.get('model', {}), TRELLO_BOARD_ID):
+        return web.Response(status=200)  # Not our board; acknowledge so Trello does not retry
+
+    # A verified callback shows Trello is reaching us, so the index can rely on callbacks for a while
+    board_state.mark_live(TRELLO_WEBHOOK_LIVE_WINDOW)
+
+    action = payload.get('action', {})
+    if board_state.loaded and board_state.apply_action(action):
+        print(f"Applied Trello webhook action: {action.get('type')}")
+
+    return web.Response(status=200)
+
+def create_webhook_app():
+    app = web.Application()
+    app.router.add_get(TRELLO_WEBHOOK_PATH, handle_webhook_probe)  # Also answers HEAD
+    app.router.add_post(TRELLO_WEBHOOK_PATH, handle_webhook_event)
+    return app
+
+# /xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx/xxxxxxxxxxxxxxxxxxxxxxxxxxx/
+
+# Function to register the board webhook with Trello unless one already points at our callback URL
+async def register_trello_webhook(callback_url=TRELLO_WEBHOOK_CALLBACK_URL):
+    try:
+        status, webhooks = await trello_client.get(f"/tokens/{TRELLO_TOKEN}/webhooks")
+        if status == 200 and any(hook['callbackURL'] == callback_url and hook['active'] for hook in webhooks):
+            return None
+
+        status, response = await trello_client.post("/webhooks", params={
+            'callbackURL': callback_url,
+            'idModel': TRELLO_BOARD_ID,
+            'description': 'Discord bot board index',
+        })
+        if status != 200:
+            return f"Error: Unable to register Trello webhook. Status code: {status}, Response: {response}"
+        return None
+    except TRELLO_REQUEST_ERRORS as e:
+        return f"Error: {e}"
+
+# Function to start the embedded webhook server; returns the runner (None if the receiver is disabled)
+async def start_webhook_server():
+    if not TRELLO_WEBHOOK_PORT:
+        return None
+    if not TRELLO_API_SECRET or not TRELLO_WEBHOOK_CALLBACK_URL:
+        # Without both, callbacks can't be verified and anyone reaching the port could rewrite the board index
+        print("Trello webhook receiver not started: TRELLO_API_SECRET and TRELLO_WEBHOOK_CALLBACK_URL are required.")
+        return None
+
+    runner = web.AppRunner(create_webhook_app())
+    await runner.setup()
+    site = web.TCPSite(runner, TRELLO_WEBHOOK_HOST, int(TRELLO_WEBHOOK_PORT))
+    await site.start()
+    print(f"Trello webhook receiver listening on {TRELLO_WEBHOOK_HOST}:{TRELLO_WEBHOOK_PORT}{TRELLO_WEBHOOK_PATH}")
+
+    error = await register_trello_webhook()
+    if error:
+        print(error)
+    return runner